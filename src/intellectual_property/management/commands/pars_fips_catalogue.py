@@ -7,20 +7,22 @@
 import logging
 import os
 import gc
+from contextlib import contextmanager
 from datetime import datetime
 
 from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
 from django.utils import timezone
 import pandas as pd
 
-from intellectual_property.models import FipsOpenDataCatalogue
+from intellectual_property.models import FipsOpenDataCatalogue, IPObject
 
 # Импортируем парсеры из пакета parsers
 from ..parsers import (
     InventionParser, UtilityModelParser, IndustrialDesignParser,
     IntegratedCircuitTopologyParser, ComputerProgramParser, DatabaseParser
 )
-from ..utils.csv_loader import load_csv_with_strategies
+from ..utils.csv_loader import load_csv_with_strategies, iter_csv_chunks
 from ..utils.filters import apply_filters, filter_by_actual
 
 logger = logging.getLogger(__name__)
@@ -39,6 +41,8 @@ class Command(BaseCommand):
         parser.add_argument('--encoding', type=str, default='utf-8', help='Кодировка CSV файла')
         parser.add_argument('--delimiter', type=str, default=',', help='Разделитель в CSV файле')
         parser.add_argument('--batch-size', type=int, default=100, help='Размер пакета для bulk-операций')
+        parser.add_argument('--chunk-size', type=int, default=50000,
+                        help='Количество строк CSV, читаемых и обрабатываемых за один проход')
         parser.add_argument('--min-year', type=int, default=2000, help='Минимальный год регистрации для фильтрации')
         parser.add_argument('--max-year', type=int, help='Максимальный год регистрации для фильтрации')
         parser.add_argument('--skip-filters', action='store_true', help='Пропустить фильтрацию (обработать все записи)')
@@ -53,6 +57,9 @@ class Command(BaseCommand):
                         help='Шаг по годам при обработке (по умолчанию 1)')
         parser.add_argument('--start-year', type=int,
                         help='Начальный год для обработки (если нужно начать не с минимального)')
+        parser.add_argument('--unlogged-during-import', action='store_true',
+                        help='Отключить журналирование записи на время импорта '
+                             '(PostgreSQL: UNLOGGED для таблиц связей, SQLite: synchronous=OFF)')
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -70,6 +77,7 @@ class Command(BaseCommand):
         self.encoding = options['encoding']
         self.delimiter = options['delimiter']
         self.batch_size = options['batch_size']
+        self.chunk_size = options['chunk_size']
         self.min_year = options['min_year']
         self.max_year = options.get('max_year')
         self.skip_filters = options['skip_filters']
@@ -80,6 +88,7 @@ class Command(BaseCommand):
         self.process_by_year = options.get('process_by_year', False)
         self.year_step = options.get('year_step', 1)
         self.start_year = options.get('start_year')
+        self.unlogged_during_import = options.get('unlogged_during_import', False)
 
         if self.dry_run:
             self.stdout.write(self.style.WARNING("\n🔍 РЕЖИМ DRY-RUN: изменения НЕ будут сохранены в БД\n"))
@@ -111,19 +120,77 @@ class Command(BaseCommand):
             'errors': 0
         }
 
-        for catalogue in catalogues:
-            self.stdout.write(self.style.SUCCESS(f"\n{'='*60}"))
-            self.stdout.write(self.style.SUCCESS(f"📁 Обработка каталога: {catalogue.name}"))
-            self.stdout.write(self.style.SUCCESS(f"   ID: {catalogue.id}, Тип: {catalogue.ip_type.name if catalogue.ip_type else 'Неизвестно'}"))
-            self.stdout.write(self.style.SUCCESS(f"{'='*60}"))
+        try:
+            with self.unlogged_import():
+                for catalogue in catalogues:
+                    self.stdout.write(self.style.SUCCESS(f"\n{'='*60}"))
+                    self.stdout.write(self.style.SUCCESS(f"📁 Обработка каталога: {catalogue.name}"))
+                    self.stdout.write(self.style.SUCCESS(f"   ID: {catalogue.id}, Тип: {catalogue.ip_type.name if catalogue.ip_type else 'Неизвестно'}"))
+                    self.stdout.write(self.style.SUCCESS(f"{'='*60}"))
+
+                    stats = self.process_catalogue(catalogue)
+
+                    for key in ['processed', 'created', 'updated', 'unchanged', 'skipped', 'errors']:
+                        total_stats[key] += stats.get(key, 0)
+                    total_stats['skipped_by_date'] += stats.get('skipped_by_date', 0)
+        finally:
+            # Пулы процессов Natasha живут на протяжении всей команды
+            for parser in self.parsers.values():
+                parser.close()
 
-            stats = self.process_catalogue(catalogue)
+        self.print_final_stats(total_stats)
 
-            for key in ['processed', 'created', 'updated', 'unchanged', 'skipped', 'errors']:
-                total_stats[key] += stats.get(key, 0)
-            total_stats['skipped_by_date'] += stats.get('skipped_by_date', 0)
+    @contextmanager
+    def unlogged_import(self):
+        """
+        Отключение журналирования записи на время импорта (--unlogged-during-import)
 
-        self.print_final_stats(total_stats)
+        Связи полностью восстанавливаются повторным парсингом каталога,
+        поэтому на время загрузки можно пожертвовать устойчивостью к сбоям:
+        - PostgreSQL: таблицы связей переводятся в UNLOGGED (без WAL);
+        - SQLite: PRAGMA synchronous = OFF (без fsync на каждую транзакцию).
+        Исходный режим восстанавливается в любом случае.
+        """
+        if not self.unlogged_during_import or self.dry_run:
+            yield
+            return
+
+        if connection.vendor == 'postgresql':
+            tables = [
+                connection.ops.quote_name(through._meta.db_table)
+                for through in (
+                    IPObject.authors.through,
+                    IPObject.owner_persons.through,
+                    IPObject.owner_organizations.through,
+                )
+            ]
+            with connection.cursor() as cursor:
+                for table in tables:
+                    cursor.execute(f"ALTER TABLE {table} SET UNLOGGED")
+            self.stdout.write(self.style.WARNING("⚡ Таблицы связей переведены в UNLOGGED на время импорта"))
+            try:
+                yield
+            finally:
+                with connection.cursor() as cursor:
+                    for table in tables:
+                        cursor.execute(f"ALTER TABLE {table} SET LOGGED")
+                self.stdout.write(self.style.SUCCESS("✅ Журналирование таблиц связей восстановлено"))
+
+        elif connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute("PRAGMA synchronous")
+                previous = cursor.fetchone()[0]
+                cursor.execute("PRAGMA synchronous = OFF")
+            self.stdout.write(self.style.WARNING("⚡ SQLite: synchronous = OFF на время импорта"))
+            try:
+                yield
+            finally:
+                with connection.cursor() as cursor:
+                    cursor.execute(f"PRAGMA synchronous = {int(previous)}")
+                self.stdout.write(self.style.SUCCESS("✅ SQLite: режим synchronous восстановлен"))
+
+        else:
+            yield
 
     def get_catalogues(self, catalogue_id=None, ip_type_slug=None):
         queryset = FipsOpenDataCatalogue.objects.all()
@@ -159,22 +226,30 @@ class Command(BaseCommand):
         except:
             return None
 
-    def get_years_from_catalogue(self, catalogue):
+    def get_years_from_catalogue(self, catalogue, df=None):
         """
         Определяет список годов, присутствующих в CSV файле каталога
+
+        Args:
+            df: уже загруженный DataFrame каталога (с колонкой '_year' или
+                'registration date'), чтобы не читать файл повторно
         """
-        df = self.load_csv(catalogue)
+        if df is None:
+            df = self.load_csv(catalogue)
         if df is None or df.empty:
             return []
         
-        if 'registration date' not in df.columns:
+        if '_year' in df.columns:
+            year_values = df['_year']
+        elif 'registration date' in df.columns:
+            year_values = df['registration date'].apply(self.extract_year_from_date)
+        else:
             self.stdout.write(self.style.WARNING(
                 f"  ⚠️ Колонка 'registration date' не найдена, не могу определить годы"
             ))
             return []
         
-        df['_year'] = df['registration date'].apply(self.extract_year_from_date)
-        all_years = sorted(df['_year'].dropna().unique().astype(int).tolist())
+        all_years = sorted(year_values.dropna().unique().astype(int).tolist())
         
         if not all_years:
             self.stdout.write(self.style.WARNING("  ⚠️ Не удалось извлечь годы из дат"))
@@ -248,6 +323,7 @@ class Command(BaseCommand):
             return stats
 
         parser = self.parsers[ip_type_slug]
+        parser.reset_catalogue_caches()
         
         # Определяем режим обработки
         if not self.process_by_year or self.skip_filters or self.min_year is None:
@@ -271,75 +347,120 @@ class Command(BaseCommand):
         return stats
 
     def _process_catalogue_normal(self, catalogue, parser, stats):
-        """Обычная обработка каталога без разбивки по годам"""
-        df = self.load_csv(catalogue)
-        if df is None or df.empty:
-            self.stdout.write(self.style.WARNING(f"  ⚠️ Файл пуст или не удалось загрузить"))
+        """
+        Обычная обработка каталога без разбивки по годам
+
+        CSV читается потоково пачками по --chunk-size строк: каждая пачка
+        фильтруется и сразу передается парсеру, поэтому пиковая память
+        ограничена размером пачки, а не размером файла.
+        """
+        chunks = self.iter_csv_chunks(catalogue, parser.get_used_columns())
+        if chunks is None:
             stats['skipped'] += 1
             return stats
-        
-        self.stdout.write(f"  📊 Загружено записей: {len(df)}")
 
-        missing_columns = self.check_required_columns(df, parser.get_required_columns())
-        if missing_columns:
-            self.stdout.write(self.style.ERROR(f"  ❌ Отсутствуют обязательные колонки: {missing_columns}"))
+        total_loaded = 0
+        total_filtered = 0
+        columns_checked = False
+
+        try:
+            for chunk_idx, chunk in enumerate(chunks, 1):
+                total_loaded += len(chunk)
+
+                if not columns_checked:
+                    missing_columns = self.check_required_columns(chunk, parser.get_required_columns())
+                    if missing_columns:
+                        self.stdout.write(self.style.ERROR(f"  ❌ Отсутствуют обязательные колонки: {missing_columns}"))
+                        stats['errors'] += 1
+                        return stats
+                    columns_checked = True
+
+                if not self.skip_filters:
+                    chunk = apply_filters(chunk, self.min_year, self.only_active, self.stdout, self.max_year)
+
+                if self.max_rows:
+                    remaining = self.max_rows - total_filtered
+                    if remaining <= 0:
+                        self.stdout.write(self.style.WARNING(f"  ⚠️ Ограничено до {self.max_rows} записей"))
+                        break
+                    if len(chunk) > remaining:
+                        chunk = chunk.head(remaining)
+
+                if chunk.empty:
+                    continue
+
+                total_filtered += len(chunk)
+                self.stdout.write(f"  📊 Пачка {chunk_idx}: {len(chunk)} записей после фильтрации")
+
+                try:
+                    chunk_stats = parser.parse_dataframe(chunk, catalogue)
+                    for key in ['processed', 'created', 'updated', 'unchanged',
+                                'skipped', 'skipped_by_date', 'errors']:
+                        stats[key] += chunk_stats.get(key, 0)
+                except Exception as e:
+                    self.stdout.write(self.style.ERROR(f"  ❌ Ошибка при парсинге пачки {chunk_idx}: {e}"))
+                    logger.error(f"Error parsing chunk {chunk_idx} of catalogue {catalogue.id}: {e}", exc_info=True)
+                    stats['errors'] += 1
+
+                # Пачка освобождается счетчиком ссылок, полная сборка мусора
+                # на каждой пачке обходила бы все кэши парсера
+                del chunk
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f"  ❌ Ошибка чтения CSV: {e}"))
+            logger.error(f"Error reading catalogue {catalogue.id}: {e}", exc_info=True)
             stats['errors'] += 1
             return stats
-        
-        if not self.skip_filters:
-            df = apply_filters(df, self.min_year, self.only_active, self.stdout, self.max_year)
-        
-        if df.empty:
+
+        if total_loaded == 0:
+            self.stdout.write(self.style.WARNING(f"  ⚠️ Файл пуст или не удалось загрузить"))
+            stats['skipped'] += 1
+            return stats
+
+        self.stdout.write(f"  📊 Загружено записей: {total_loaded}, после фильтрации: {total_filtered}")
+
+        if total_filtered == 0:
             self.stdout.write(self.style.WARNING(f"  ⚠️ Нет данных после фильтрации"))
             stats['skipped'] += 1
+
+        return stats
+
+    def _process_catalogue_by_year(self, catalogue, parser, stats):
+        """
+        Обработка каталога с разбивкой по годам
+
+        CSV читается один раз: по тому же DataFrame определяются годы
+        и выбираются записи каждого года.
+        """
+        full_df = self.load_csv(catalogue, parser.get_used_columns())
+        if full_df is None or full_df.empty:
+            stats['skipped'] += 1
             return stats
         
-        self.stdout.write(f"  📊 После фильтрации: {len(df)} записей")
-        
-        if self.max_rows and len(df) > self.max_rows:
-            df = df.head(self.max_rows)
-            self.stdout.write(self.style.WARNING(f"  ⚠️ Ограничено до {self.max_rows} записей"))
-        
-        try:
-            parser_stats = parser.parse_dataframe(df, catalogue)
-            stats.update(parser_stats)
-        except Exception as e:
-            self.stdout.write(self.style.ERROR(f"  ❌ Ошибка при парсинге: {e}"))
-            logger.error(f"Error parsing catalogue {catalogue.id}: {e}", exc_info=True)
+        missing_columns = self.check_required_columns(full_df, parser.get_required_columns())
+        if missing_columns:
+            self.stdout.write(self.style.ERROR(f"  ❌ Отсутствуют обязательные колонки: {missing_columns}"))
             stats['errors'] += 1
+            return stats
+        
+        # Добавляем колонку с годом
+        if 'registration date' in full_df.columns:
+            full_df['_year'] = full_df['registration date'].apply(self.extract_year_from_date)
         
-        return stats
-
-    def _process_catalogue_by_year(self, catalogue, parser, stats):
-        """Обработка каталога с разбивкой по годам"""
         # Получаем список годов - теперь с учетом skip_filters!
-        years = self.get_years_from_catalogue(catalogue)
+        years = self.get_years_from_catalogue(catalogue, full_df)
         
         if not years:
             self.stdout.write(self.style.WARNING(
                 f"  ⚠️ Не удалось определить годы в каталоге, обрабатываем целиком"
             ))
+            del full_df
+            gc.collect()
             return self._process_catalogue_normal(catalogue, parser, stats)
         
         self.stdout.write(self.style.SUCCESS(
             f"\n  📅 Будет обработано {len(years)} лет: {years[0]} - {years[-1]}"
         ))
         
-        # Загружаем полный DataFrame один раз
-        full_df = self.load_csv(catalogue)
-        if full_df is None or full_df.empty:
-            stats['skipped'] += 1
-            return stats
-        
-        missing_columns = self.check_required_columns(full_df, parser.get_required_columns())
-        if missing_columns:
-            self.stdout.write(self.style.ERROR(f"  ❌ Отсутствуют обязательные колонки: {missing_columns}"))
-            stats['errors'] += 1
-            return stats
-        
-        # Добавляем колонку с годом
-        full_df['_year'] = full_df['registration date'].apply(self.extract_year_from_date)
-        
         # Обрабатываем годы с заданным шагом
         years_to_process = years[::self.year_step]
         
@@ -391,16 +512,25 @@ class Command(BaseCommand):
         
         return stats
 
-    def load_csv(self, catalogue):
+    def load_csv(self, catalogue, usecols=None):
         file_path = catalogue.catalogue_file.path
 
         if not os.path.exists(file_path):
             self.stdout.write(self.style.ERROR(f"  ❌ Файл не найден: {file_path}"))
             return None
 
-        df = load_csv_with_strategies(file_path, self.encoding, self.delimiter, self.stdout)
+        df = load_csv_with_strategies(file_path, self.encoding, self.delimiter, self.stdout, usecols)
         return df
 
+    def iter_csv_chunks(self, catalogue, usecols=None):
+        file_path = catalogue.catalogue_file.path
+
+        if not os.path.exists(file_path):
+            self.stdout.write(self.style.ERROR(f"  ❌ Файл не найден: {file_path}"))
+            return None
+
+        return iter_csv_chunks(file_path, self.encoding, self.delimiter, self.chunk_size, self.stdout, usecols)
+
     def check_required_columns(self, df, required_columns):
         missing = [col for col in required_columns if col not in df.columns]
         return missing
@@ -4,13 +4,18 @@
 """
 
 import logging
+import os
 import re
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from collections import defaultdict
 from datetime import datetime
+from functools import lru_cache
 from typing import Optional, List, Dict, Any, Tuple
-import gc
 
-from django.db import models
+from django.db import IntegrityError, connection, models, transaction
 from django.utils.text import slugify
+import numpy as np
 import pandas as pd
 from tqdm import tqdm
 
@@ -26,9 +31,48 @@ from .processors import (
 )
 
 from ..utils.progress import batch_iterator
+from ..utils.relations import RelationsBuffer
 
 logger = logging.getLogger(__name__)
 
+# Строковые значения, которые считаются пустыми
+NULL_STRINGS = ['', 'None', 'null', 'NULL', 'nan']
+
+# Значения, которые parse_bool() считает истиной (после lower/strip)
+TRUE_STRINGS = ['1', 'true', 'yes', 'да', 'действует', 't', '1.0', 'активен']
+
+# Форматы дат в каталогах ФИПС в порядке проверки
+DATE_FORMATS = ['%Y%m%d', '%Y-%m-%d', '%d.%m.%Y', '%Y/%m/%d']
+
+# Размер пачки для bulk_create организаций и связей M2M.
+# Связующие таблицы содержат по 2 колонки, поэтому 10 000 строк
+# укладываются в лимит параметров запроса с запасом.
+BULK_BATCH_SIZE = int(os.environ.get('IP_BULK_CREATE_BATCH_SIZE', 10000))
+
+# Размер пачки создания/обновления IPObject. Внутри пачки bulk_create
+# дополнительно режется по лимиту параметров запроса (_insert_batch_size),
+# bulk_update - по лимиту бэкенда
+OBJECT_BATCH_SIZE = int(os.environ.get('IP_OBJECT_BATCH_SIZE', 5000))
+
+# Размер пачки ключей в IN-списках SELECT/DELETE (поиск существующих
+# записей, людей, организаций, связей). Больше пачка - меньше запросов,
+# но длиннее текст запроса и план; SQLite до 3.32 принимает не более
+# 999 параметров в запросе, поэтому значение по умолчанию 500.
+QUERY_BATCH_SIZE = int(os.environ.get('IP_QUERY_BATCH_SIZE', 500))
+
+# Лимит параметров одного запроса в PostgreSQL (2^16 - 1). Пачка INSERT
+# модели с N колонками не может быть больше MAX_QUERY_PARAMS // N строк
+MAX_QUERY_PARAMS = 65535
+
+# Связи хранятся двумя массивами int64 (ip_ids, entity_ids) вместо
+# списка кортежей: 16 байт на связь против ~100 байт на кортеж из двух int
+RelationArrays = Tuple[np.ndarray, np.ndarray]
+EMPTY_RELATIONS: RelationArrays = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64))
+
+# Число потоков для параллельной загрузки существующих записей
+# на серверных СУБД (ограничено числом соединений, а не CPU)
+QUERY_WORKERS = int(os.environ.get('IP_QUERY_WORKERS', 8))
+
 
 class BaseFIPSParser:
     """Базовый класс для всех парсеров каталогов ФИПС"""
@@ -44,6 +88,10 @@ class BaseFIPSParser:
         self.type_detector = EntityTypeDetector()
         self.person_formatter = PersonNameFormatter()
         self.rid_formatter = RIDNameFormatter()
+        # Названия РИД в каталогах часто повторяются, форматирование - чистая функция
+        self.format_rid_name = lru_cache(maxsize=200_000)(self.rid_formatter.format)
+        # Одни и те же авторы встречаются в тысячах записей каталога
+        self.format_person_name = lru_cache(maxsize=200_000)(self.person_formatter.format)
 
         # Кэши для оптимизации
         self.country_cache = {}
@@ -54,6 +102,9 @@ class BaseFIPSParser:
         self.city_cache = {}
         self.activity_type_cache = {}
         self.ceo_position_cache = {}
+        self.slug_cache = {}
+        self.slug_suffix_cache = {}
+        self.next_id_cache = {}
 
     def get_ip_type(self):
         """Должен быть переопределен в дочерних классах"""
@@ -63,6 +114,40 @@ class BaseFIPSParser:
         """Возвращает список обязательных колонок"""
         raise NotImplementedError
 
+    def get_used_columns(self):
+        """
+        Возвращает список колонок CSV, которые читает парсер
+
+        Остальные колонки при загрузке CSV пропускаются. None - читать все.
+        """
+        return None
+
+    def get_object_fields(self):
+        """
+        Возвращает поля IPObject, которые парсер заполняет и сравнивает
+
+        Из БД для существующих записей читаются только они (плюс id,
+        registration_number и updated_at). None - читать все поля.
+        """
+        return None
+
+    def reset_catalogue_caches(self):
+        """
+        Сброс кэшей, отражающих текущее состояние таблиц Person и Organization
+
+        Команда держит по экземпляру на каждый тип РИД, а люди и организации
+        общие для всех парсеров. Поэтому перед каждым каталогом счетчики ID
+        и множества занятых slug перечитываются из БД, чтобы не выдать ID
+        и slug, уже занятые другим парсером.
+        """
+        self.next_id_cache.clear()
+        self.slug_cache.clear()
+        self.slug_suffix_cache.clear()
+
+    def close(self):
+        """Освобождение ресурсов парсера после завершения команды"""
+        self.type_detector.close()
+
     def parse_dataframe(self, df, catalogue, year=None):
         """
         Основной метод парсинга DataFrame
@@ -74,12 +159,126 @@ class BaseFIPSParser:
         """
         raise NotImplementedError
 
+    def clean_dataframe(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Векторная очистка всех колонок DataFrame
+
+        Результат для каждой ячейки совпадает с clean_string(), но
+        очистка выполняется по колонкам целиком, а не вызовом функции
+        на каждую ячейку в цикле подготовки данных.
+        """
+        cleaned = {}
+        for column in df.columns:
+            values = df[column].fillna('').astype(str).str.strip()
+            cleaned[column] = values.mask(values.isin(NULL_STRINGS), '')
+        return pd.DataFrame(cleaned, index=df.index)
+
+    def iter_rows(self, df):
+        """
+        Построчный обход DataFrame
+
+        Строки отдаются словарями {колонка: значение}: у них тот же
+        метод get(), что и у Series из iterrows(), но itertuples()
+        не создает отдельный Series на каждую строку.
+        """
+        columns = list(df.columns)
+        for values in df.itertuples(index=False, name=None):
+            yield dict(zip(columns, values))
+
+    def load_existing_objects(self, ip_type, reg_numbers: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Загрузка существующих IPObject пачками по регистрационным номерам
+
+        Записи читаются через values(): для сравнения с CSV нужны только
+        значения полей, экземпляры моделей не создаются. Читаются только
+        поля из get_object_fields(), без описаний и других данных,
+        которые заполняют другие команды.
+
+        На PostgreSQL все номера передаются одним массивом в ANY(%s),
+        без разбиения на пачки. На остальных серверных СУБД пачки
+        независимы и читаются параллельно, каждая в своем соединении.
+        SQLite читается последовательно.
+
+        Returns:
+            Словарь {registration_number: {поле: значение}}
+        """
+        if connection.vendor == 'postgresql':
+            existing_objects = self._fetch_objects_by_array(ip_type, reg_numbers)
+            self.stdout.write(f"      Найдено существующих: {len(existing_objects)}")
+            return existing_objects
+
+        batches = list(batch_iterator(reg_numbers, QUERY_BATCH_SIZE))
+        existing_objects = {}
+
+        with tqdm(total=len(reg_numbers), desc="Загрузка пачками", unit="зап") as pbar:
+            if connection.vendor == 'sqlite' or len(batches) < 2:
+                for batch_numbers in batches:
+                    existing_objects.update(self._fetch_objects_batch(ip_type, batch_numbers))
+                    pbar.update(len(batch_numbers))
+                return existing_objects
+
+            with ThreadPoolExecutor(max_workers=QUERY_WORKERS) as executor:
+                results = executor.map(
+                    lambda batch_numbers: self._fetch_objects_batch_in_thread(ip_type, batch_numbers),
+                    batches
+                )
+                for batch_numbers, objects in zip(batches, results):
+                    existing_objects.update(objects)
+                    pbar.update(len(batch_numbers))
+
+        return existing_objects
+
+    def _object_value_fields(self) -> List[str]:
+        """Поля IPObject, читаемые для существующих записей (имена как в values())"""
+        fields = self.get_object_fields()
+        if not fields:
+            return [field.attname for field in IPObject._meta.concrete_fields]
+        return ['id', 'registration_number', 'updated_at', *fields]
+
+    def _fetch_objects_batch(self, ip_type, batch_numbers: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Загрузка одной пачки IPObject: {registration_number: {поле: значение}}"""
+        return {
+            row['registration_number']: row
+            for row in IPObject.objects.filter(
+                registration_number__in=batch_numbers,
+                ip_type=ip_type
+            ).values(*self._object_value_fields())
+        }
+
+    def _fetch_objects_by_array(self, ip_type, reg_numbers: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        PostgreSQL: загрузка IPObject одним запросом с массивом номеров
+
+        Массив передается одним параметром, поэтому лимит на число
+        параметров запроса не действует, а план строится один раз.
+        """
+        opts = IPObject._meta
+        quote = connection.ops.quote_name
+        fields = self._object_value_fields()
+        columns = ', '.join(quote(opts.get_field(field).column) for field in fields)
+        sql = (
+            f"SELECT {columns} FROM {quote(opts.db_table)} "
+            f"WHERE {quote(opts.get_field('ip_type').column)} = %s "
+            f"AND {quote(opts.get_field('registration_number').column)} = ANY(%s)"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [ip_type.pk, list(reg_numbers)])
+            rows = (dict(zip(fields, values)) for values in cursor.fetchall())
+            return {row['registration_number']: row for row in rows}
+
+    def _fetch_objects_batch_in_thread(self, ip_type, batch_numbers: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Загрузка пачки IPObject в отдельном потоке со своим соединением с БД"""
+        try:
+            return self._fetch_objects_batch(ip_type, batch_numbers)
+        finally:
+            connection.close()
+
     def clean_string(self, value):
         """Очистка строкового значения"""
         if pd.isna(value) or value is None:
             return ''
         value = str(value).strip()
-        if value in ['', 'None', 'null', 'NULL', 'nan']:
+        if value in NULL_STRINGS:
             return ''
         return value
 
@@ -92,7 +291,7 @@ class BaseFIPSParser:
         if not date_str:
             return None
 
-        for fmt in ['%Y%m%d', '%Y-%m-%d', '%d.%m.%Y', '%Y/%m/%d']:
+        for fmt in DATE_FORMATS:
             try:
                 return datetime.strptime(date_str, fmt).date()
             except (ValueError, TypeError):
@@ -103,12 +302,57 @@ class BaseFIPSParser:
         except (ValueError, TypeError):
             return None
 
+    def parse_date_columns(self, df: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
+        """
+        Векторный парсинг колонок дат очищенного DataFrame
+
+        Форматы DATE_FORMATS проверяются в том же порядке, что и в
+        parse_date(), но каждый применяется сразу ко всей колонке.
+        Значения, не подошедшие ни под один формат (в т.ч. даты вне
+        диапазона pandas), разбираются parse_date() поштучно.
+        В колонках остаются объекты date или None.
+        """
+        for column in columns:
+            if column not in df.columns:
+                continue
+
+            values = df[column]
+            parsed = np.full(len(values), None, dtype=object)
+            pending = (values != '').to_numpy(copy=True)
+
+            for fmt in DATE_FORMATS:
+                if not pending.any():
+                    break
+                dates = pd.to_datetime(values[pending], format=fmt, errors='coerce')
+                matched = dates.notna().to_numpy()
+                positions = np.flatnonzero(pending)[matched]
+                parsed[positions] = dates[matched].dt.date.to_numpy()
+                pending[positions] = False
+
+            for position in np.flatnonzero(pending):
+                parsed[position] = self.parse_date(values.iat[position])
+
+            df[column] = pd.Series(parsed, index=df.index, dtype=object)
+
+        return df
+
     def parse_bool(self, value):
         """Парсинг булевого значения"""
         if pd.isna(value) or not value:
             return False
         value = str(value).lower().strip()
-        return value in ['1', 'true', 'yes', 'да', 'действует', 't', '1.0', 'активен']
+        return value in TRUE_STRINGS
+
+    def parse_bool_columns(self, df: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
+        """
+        Векторный парсинг булевых колонок очищенного DataFrame
+
+        Результат для каждой ячейки совпадает с parse_bool().
+        """
+        for column in columns:
+            if column in df.columns:
+                df[column] = df[column].str.lower().isin(TRUE_STRINGS)
+        return df
 
     def get_or_create_country(self, code):
         """Получение страны по коду"""
@@ -158,7 +402,7 @@ class BaseFIPSParser:
 
             author = author.strip('"')
             author = re.sub(r'\s*\([A-Z]{2}\)', '', author)
-            author = self.person_formatter.format(author)
+            author = self.format_person_name(author)
 
             parts = author.split()
 
@@ -229,8 +473,7 @@ class BaseFIPSParser:
             return person
 
         try:
-            max_id = Person.objects.aggregate(models.Max('ceo_id'))['ceo_id__max'] or 0
-            new_id = max_id + 1
+            new_id = self._reserve_ids(Person, 'ceo_id')
 
             if 'full_name' in person_data:
                 full_name = person_data['full_name']
@@ -246,11 +489,7 @@ class BaseFIPSParser:
             if not base_slug:
                 base_slug = 'person'
 
-            unique_slug = base_slug
-            counter = 1
-            while Person.objects.filter(slug=unique_slug).exists():
-                unique_slug = f"{base_slug}-{counter}"
-                counter += 1
+            unique_slug = self._generate_unique_slug(base_slug, Person)
 
             person = Person.objects.create(
                 ceo_id=new_id,
@@ -381,19 +620,14 @@ class BaseFIPSParser:
 
         # Не нашли - создаем новую с оригинальным названием
         try:
-            max_id = Organization.objects.aggregate(models.Max('organization_id'))['organization_id__max'] or 0
-            new_id = max_id + 1
+            new_id = self._reserve_ids(Organization, 'organization_id')
 
             # Генерируем slug из оригинального названия
             base_slug = slugify(org_name[:50])
             if not base_slug:
                 base_slug = 'organization'
 
-            unique_slug = base_slug
-            counter = 1
-            while Organization.objects.filter(slug=unique_slug).exists():
-                unique_slug = f"{base_slug}-{counter}"
-                counter += 1
+            unique_slug = self._generate_unique_slug(base_slug, Organization)
 
             # Сохраняем оригинальное название без изменений
             org = Organization.objects.create(
@@ -437,6 +671,12 @@ class BaseFIPSParser:
         
         self.stdout.write(f"      Всего уникальных людей для обработки: {total_names}")
         
+        # ШАГ 0: Люди, найденные или созданные в предыдущих пачках/годах
+        all_names = self._take_cached_entities(all_names, self.person_cache, person_map)
+        if not all_names:
+            self.stdout.write(f"      ✅ Обработано людей: {len(person_map)} (все из кэша)")
+            return person_map
+        
         # ШАГ 1: Поиск существующих людей
         self.stdout.write(f"      Поиск существующих людей в БД...")
         
@@ -452,7 +692,7 @@ class BaseFIPSParser:
         
         # ШАГ 3: Создаем новых людей
         if new_names:
-            new_persons_map = self._create_new_persons(new_names)
+            new_persons_map = self._create_new_persons(new_names, name_to_parts)
             person_map.update(new_persons_map)
         
         # ШАГ 4: Добавляем существующих людей в маппинг
@@ -462,6 +702,28 @@ class BaseFIPSParser:
         
         return person_map
 
+    def _take_cached_entities(self, names: List[str], cache: Dict, entity_map: Dict) -> List[str]:
+        """
+        Перенос уже известных сущностей из кэша парсера в entity_map
+
+        Кэши живут все время работы команды, поэтому имена, повторяющиеся
+        в разных пачках CSV, годах и каталогах, не ищутся в БД повторно.
+
+        Returns:
+            Список имен, которых нет в кэше
+        """
+        missing = []
+        for name in names:
+            entity = cache.get(name)
+            if entity is not None:
+                entity_map[name] = entity
+            else:
+                missing.append(name)
+
+        if entity_map:
+            self.stdout.write(f"      Найдено в кэше: {len(entity_map)}")
+        return missing
+
     def _extract_name_parts(self, names: List[str]) -> Dict[str, Tuple[str, str, str]]:
         """
         Извлечение частей ФИО из списка имен
@@ -490,128 +752,174 @@ class BaseFIPSParser:
         """
         Поиск существующих людей в БД
         
+        Вместо OR-цепочки Q по каждому имени выполняется выборка по
+        last_name__in/first_name__in (индекс last_name, first_name), а
+        точное сопоставление с отчеством делается в Python по словарю
+        (фамилия, имя) -> [(полное_имя, отчество)].
+        
         Returns:
             Словарь {имя: объект Person}
         """
         existing_persons = {}
-        found_count = 0
-        batch_size = 100
-        all_names_list = list(name_to_parts.keys())
         
-        for i in range(0, len(all_names_list), batch_size):
-            batch_names = all_names_list[i:i+batch_size]
-            
-            # Строим условия поиска
-            name_conditions = models.Q()
-            batch_name_to_parts = {}
-            
-            for name in batch_names:
-                last, first, middle = name_to_parts[name]
-                batch_name_to_parts[name] = (last, first, middle)
-                
-                if middle:
-                    name_conditions |= models.Q(
-                        last_name=last, 
-                        first_name=first, 
-                        middle_name=middle
-                    )
-                else:
-                    name_conditions |= models.Q(
-                        last_name=last, 
-                        first_name=first
-                    ) & (models.Q(middle_name='') | models.Q(middle_name__isnull=True))
+        key_to_names = defaultdict(list)
+        for name, (last, first, middle) in name_to_parts.items():
+            key_to_names[(last, first)].append((name, middle))
+        
+        last_names = sorted({last for last, _ in key_to_names})
+        
+        processed = 0
+        for batch_last_names in batch_iterator(last_names, QUERY_BATCH_SIZE):
+            processed += len(batch_last_names)
+            batch_set = set(batch_last_names)
+            batch_first_names = list({first for last, first in key_to_names if last in batch_set})
             
-            # Ищем людей
-            for person in Person.objects.filter(name_conditions).only(
-                'ceo_id', 'last_name', 'first_name', 'middle_name', 'ceo', 'slug'
-            ):
-                for name, (last, first, middle) in batch_name_to_parts.items():
-                    if (person.last_name == last and 
-                        person.first_name == first and 
-                        (not middle or person.middle_name == middle)):
+            for person in Person.objects.filter(
+                last_name__in=batch_last_names,
+                first_name__in=batch_first_names,
+            ).only('ceo_id', 'last_name', 'first_name', 'middle_name', 'ceo', 'slug'):
+                candidates = key_to_names.get((person.last_name, person.first_name))
+                if not candidates:
+                    continue
+                person_middle = person.middle_name or ''
+                for name, middle in candidates:
+                    if name not in existing_persons and person_middle == middle:
                         existing_persons[name] = person
                         self.person_cache[name] = person
-                        found_count += 1
-                        break
             
-            if (i + len(batch_names)) % 500 == 0 or (i + len(batch_names)) >= len(all_names_list):
-                self.stdout.write(f"         Обработано {i + len(batch_names)}/{len(all_names_list)} имен")
+            if processed % 5000 == 0 or processed >= len(last_names):
+                self.stdout.write(f"         Обработано {processed}/{len(last_names)} фамилий")
         
-        self.stdout.write(f"      Найдено существующих: {found_count}")
+        self.stdout.write(f"      Найдено существующих: {len(existing_persons)}")
         return existing_persons
 
-    def _create_new_persons(self, new_names: List[str]) -> Dict[str, Person]:
+    def _create_new_persons(
+        self,
+        new_names: List[str],
+        name_to_parts: Dict[str, Tuple[str, str, str]],
+    ) -> Dict[str, Person]:
         """
         Создание новых людей
         
+        Части ФИО берутся из name_to_parts, уже разобранного
+        в _extract_name_parts, повторно имена не разбиваются.
+        
         Returns:
             Словарь {имя: объект Person}
         """
         self.stdout.write(f"      Подготовка данных для создания...")
         
         # Получаем все существующие slugs
-        existing_slugs = set(Person.objects.values_list('slug', flat=True))
+        existing_slugs = self._get_slug_set(Person)
         self.stdout.write(f"         Существующих slug-ов в БД: {len(existing_slugs)}")
         
         people_to_create = []
         
         for name in new_names:
-            if pd.isna(name) or not name:
-                continue
+            last_name, first_name, middle_name = name_to_parts[name]
             
-            name = str(name).strip()
-            parts = name.split()
+            # Формируем базовый slug
+            base_slug = slugify(' '.join(filter(None, (last_name, first_name, middle_name))))
+            if not base_slug:
+                base_slug = 'person'
             
-            if len(parts) >= 2:
-                last_name = parts[0]
-                first_name = parts[1]
-                middle_name = parts[2] if len(parts) > 2 else ''
-                
-                # Формируем базовый slug
-                name_parts_list = [last_name, first_name]
-                if middle_name:
-                    name_parts_list.append(middle_name)
-                
-                base_slug = slugify(' '.join(name_parts_list))
-                if not base_slug:
-                    base_slug = 'person'
-                
-                # Генерируем уникальный slug
-                unique_slug, existing_slugs = self._generate_unique_slug(base_slug, existing_slugs)
-                
-                # Создаем объект без ID (ID будет назначен при bulk_create)
-                person = Person(
-                    ceo=name,
-                    last_name=last_name,
-                    first_name=first_name,
-                    middle_name=middle_name or '',
-                    slug=unique_slug
-                )
-                people_to_create.append(person)
+            # Генерируем уникальный slug
+            unique_slug = self._generate_unique_slug(base_slug, Person)
+            
+            # Создаем объект без ID (ID будет назначен при bulk_create)
+            person = Person(
+                ceo=name,
+                last_name=last_name,
+                first_name=first_name,
+                middle_name=middle_name,
+                slug=unique_slug
+            )
+            people_to_create.append(person)
         
         # Создаем людей
         return self._bulk_create_persons(people_to_create, len(new_names))
 
-    def _generate_unique_slug(self, base_slug: str, existing_slugs: set) -> Tuple[str, set]:
+    def _reserve_ids(self, model, id_field: str, count: int = 1) -> int:
         """
-        Генерация уникального slug
-        
+        Резервирование диапазона из count ID для создаваемых записей
+
+        Первичные ключи Person и Organization назначаются вручную и не
+        имеют последовательности в БД, поэтому MAX читается один раз на
+        каталог (см. reset_catalogue_caches), а дальше ID выдаются из
+        счетчика в памяти. Сброс счетчика (next_id_cache.pop) заставляет
+        перечитать MAX.
+
         Returns:
-            Tuple[уникальный_slug, обновленное_множество_slugs]
+            Первый ID зарезервированного диапазона
         """
-        unique_slug = base_slug
-        counter = 1
-        while unique_slug in existing_slugs:
-            unique_slug = f"{base_slug}-{counter}"
+        next_id = self.next_id_cache.get(model)
+        if next_id is None:
+            max_id = model.objects.aggregate(max_id=models.Max(id_field))['max_id'] or 0
+            next_id = max_id + 1
+        self.next_id_cache[model] = next_id + count
+        return next_id
+
+    def _insert_batch_size(self, model) -> int:
+        """
+        Размер пачки bulk_create для модели
+
+        Не больше BULK_BATCH_SIZE и не больше числа строк, при котором
+        один INSERT укладывается в лимит параметров запроса.
+        """
+        return max(1, min(BULK_BATCH_SIZE, MAX_QUERY_PARAMS // len(model._meta.concrete_fields)))
+
+    def _get_slug_set(self, model) -> set:
+        """
+        Множество занятых slug модели
+
+        Загружается из БД один раз на каталог и дополняется
+        по мере генерации новых slug, поэтому проверка уникальности идет
+        по множеству в памяти, а не запросом exists() на каждый вариант.
+        Читается потоково через iterator(), без промежуточного списка
+        всех slug в кэше QuerySet.
+        """
+        slugs = self.slug_cache.get(model)
+        if slugs is None:
+            slugs = set(model.objects.values_list('slug', flat=True).iterator(chunk_size=BULK_BATCH_SIZE))
+            self.slug_cache[model] = slugs
+            # Счетчики суффиксов действительны только для этого множества
+            self.slug_suffix_cache.pop(model, None)
+        return slugs
+
+    def _generate_unique_slug(self, base_slug: str, model) -> str:
+        """
+        Генерация уникального slug для модели
+        
+        Для каждого базового slug запоминается последний выданный
+        суффикс -N: следующий поиск продолжается с него, а не перебирает
+        все занятые варианты начиная с -1. Счетчики сбрасываются вместе
+        с множеством занятых slug (см. _get_slug_set). Сгенерированный
+        slug добавляется в множество занятых slug модели.
+        """
+        existing_slugs = self._get_slug_set(model)
+        if base_slug not in existing_slugs:
+            existing_slugs.add(base_slug)
+            return base_slug
+        
+        suffix_counters = self.slug_suffix_cache.setdefault(model, {})
+        counter = suffix_counters.get(base_slug, 0)
+        while True:
             counter += 1
+            unique_slug = f"{base_slug}-{counter}"
+            if unique_slug not in existing_slugs:
+                break
         
+        suffix_counters[base_slug] = counter
         existing_slugs.add(unique_slug)
-        return unique_slug, existing_slugs
+        return unique_slug
 
     def _bulk_create_persons(self, people_to_create: List[Person], total_count: int) -> Dict[str, Person]:
         """
         Массовое создание людей с обработкой ошибок
         
+        ceo_id назначается заранее, поэтому объекты, переданные в
+        bulk_create, сразу пригодны для маппинга без повторного SELECT.
+        
         Returns:
             Словарь {имя: объект Person}
         """
@@ -622,110 +930,117 @@ class BaseFIPSParser:
         
         BATCH_SIZE = 500
         created_count = 0
+        batch_count = 0
         created_map = {}
         
-        for i in range(0, len(people_to_create), BATCH_SIZE):
-            batch = people_to_create[i:i+BATCH_SIZE]
-            
-            # Получаем актуальный max_id перед каждой пачкой
-            max_id = Person.objects.aggregate(models.Max('ceo_id'))['ceo_id__max'] or 0
-            next_id = max_id + 1
-            
-            # Назначаем ID для текущей пачки
-            for j, person in enumerate(batch):
-                person.ceo_id = next_id + j
+        # ID назначаются сразу на всех людей одним диапазоном
+        next_id = self._reserve_ids(Person, 'ceo_id', len(people_to_create))
+        for j, person in enumerate(people_to_create):
+            person.ceo_id = next_id + j
+        
+        for batch in batch_iterator(people_to_create, BATCH_SIZE):
             
-            # Фильтруем дубликаты в пачке
-            batch = self._filter_duplicate_persons(batch)
+            # Фильтруем дубликаты в пачке (люди с тем же ceo уже есть в БД)
+            batch, existing_by_ceo = self._filter_duplicate_persons(batch)
+            created_map.update(existing_by_ceo)
             if not batch:
                 continue
             
-            # Пробуем создать пачкой
+            # Пробуем создать пачкой. Конфликты отфильтрованы заранее, поэтому
+            # ignore_conflicts не нужен и все объекты пачки попадают в БД
             try:
-                Person.objects.bulk_create(batch, batch_size=BATCH_SIZE, ignore_conflicts=True)
-                created_count += len(batch)
-                self.stdout.write(self.style.SUCCESS(f"         ✅ Создана пачка из {len(batch)} человек"))
+                Person.objects.bulk_create(batch, batch_size=self._insert_batch_size(Person))
+                created = batch
+                batch_count += 1
             except Exception as e:
                 self.stdout.write(self.style.WARNING(f"         Ошибка при создании пачки: {e}"))
-                created_count += self._create_persons_one_by_one(batch)
+                created = self._create_persons_one_by_one(batch)
+            
+            for person in created:
+                created_map[person.ceo] = person
+                self.person_cache[person.ceo] = person
+            created_count += len(created)
             
             if created_count % 5000 == 0 or created_count >= total_count:
                 percent = (created_count / total_count) * 100 if total_count > 0 else 0
                 self.stdout.write(f"         Прогресс: {created_count}/{total_count} ({percent:.1f}%)")
         
-        # Получаем созданных людей для маппинга
-        if created_count > 0:
-            created_names = [p.ceo for p in people_to_create[:created_count]]
-            created_map = self._fetch_created_persons(created_names)
-        
+        # Одна итоговая строка вместо строки на каждую пачку
+        self.stdout.write(self.style.SUCCESS(f"         ✅ Пачек создано: {batch_count}, "
+                                             f"всего людей: {created_count}"))
         return created_map
 
-    def _filter_duplicate_persons(self, batch: List[Person]) -> List[Person]:
+    def _filter_duplicate_persons(self, batch: List[Person]) -> Tuple[List[Person], Dict[str, Person]]:
         """
-        Фильтрация дубликатов в пачке по ceo_id и slug
+        Фильтрация дубликатов в пачке по ceo_id, ceo и slug
+        
+        Returns:
+            Tuple[пачка без конфликтов, {ceo: уже существующий Person}]
         """
         batch_ceo_ids = [p.ceo_id for p in batch]
+        batch_names = [p.ceo for p in batch]
         batch_slugs = [p.slug for p in batch]
         
-        existing_by_ceo = set(Person.objects.filter(ceo_id__in=batch_ceo_ids).values_list('ceo_id', flat=True))
+        existing_by_ceo_id = set(Person.objects.filter(ceo_id__in=batch_ceo_ids).values_list('ceo_id', flat=True))
+        existing_by_ceo = {
+            person.ceo: person
+            for person in Person.objects.filter(ceo__in=batch_names).only('ceo_id', 'ceo', 'slug')
+        }
         existing_by_slug = set(Person.objects.filter(slug__in=batch_slugs).values_list('slug', flat=True))
         
-        if existing_by_ceo or existing_by_slug:
+        for name, person in existing_by_ceo.items():
+            self.person_cache[name] = person
+        
+        if existing_by_ceo_id or existing_by_ceo or existing_by_slug:
             self.stdout.write(self.style.WARNING(f"         Найдены дубликаты в пачке:"))
+            if existing_by_ceo_id:
+                self.stdout.write(self.style.WARNING(f"            по ceo_id: {list(existing_by_ceo_id)[:5]}..."))
             if existing_by_ceo:
-                self.stdout.write(self.style.WARNING(f"            по ceo_id: {list(existing_by_ceo)[:5]}..."))
+                self.stdout.write(self.style.WARNING(f"            по ceo: {list(existing_by_ceo)[:5]}..."))
             if existing_by_slug:
                 self.stdout.write(self.style.WARNING(f"            по slug: {list(existing_by_slug)[:5]}..."))
             
             batch = [p for p in batch 
-                    if p.ceo_id not in existing_by_ceo 
+                    if p.ceo_id not in existing_by_ceo_id 
+                    and p.ceo not in existing_by_ceo
                     and p.slug not in existing_by_slug]
         
-        return batch
+        return batch, existing_by_ceo
 
-    def _create_persons_one_by_one(self, batch: List[Person]) -> int:
+    def _create_persons_one_by_one(self, batch: List[Person]) -> List[Person]:
         """
         Создание людей по одному в случае ошибки пачки
+        
+        Returns:
+            Список успешно созданных людей
         """
-        created = 0
+        created = []
         for person in batch:
+            base_slug = re.sub(r'-\d+$', '', person.slug)
             for attempt in range(10):
                 try:
-                    # Получаем свежий max_id перед каждой попыткой
-                    current_max = Person.objects.aggregate(models.Max('ceo_id'))['ceo_id__max'] or 0
-                    person.ceo_id = current_max + 1
+                    person.ceo_id = self._reserve_ids(Person, 'ceo_id')
                     
-                    # Проверяем и обновляем slug при необходимости
-                    if Person.objects.filter(slug=person.slug).exists():
-                        base_slug = person.slug.split('-')[0]
-                        counter = 1
-                        new_slug = f"{base_slug}-{counter}"
-                        while Person.objects.filter(slug=new_slug).exists():
-                            counter += 1
-                            new_slug = f"{base_slug}-{counter}"
-                        person.slug = new_slug
+                    # slug уже проверен по множеству занятых slug. Если он
+                    # оказался занят другим процессом, при повторной попытке
+                    # берется следующий свободный суффикс без запросов exists()
+                    if attempt:
+                        person.slug = self._generate_unique_slug(base_slug, Person)
                     
-                    person.save()
-                    created += 1
+                    # ID назначен вручную: без force_insert занятый ID привел бы
+                    # к UPDATE чужой записи вместо ошибки
+                    person.save(force_insert=True)
+                    created.append(person)
                     self.stdout.write(self.style.SUCCESS(f"            ✅ Создан: {person.ceo}"))
                     break
                 except Exception as e:
+                    # ID мог быть занят другим процессом - перечитываем MAX перед следующей попыткой
+                    self.next_id_cache.pop(Person, None)
                     if attempt == 9:
                         self.stdout.write(self.style.ERROR(f"            ❌ Не удалось создать {person.ceo}: {e}"))
                     continue
         return created
 
-    def _fetch_created_persons(self, names: List[str]) -> Dict[str, Person]:
-        """
-        Получение созданных людей из БД для маппинга
-        """
-        person_map = {}
-        for batch in batch_iterator(names, 1000):
-            for person in Person.objects.filter(ceo__in=batch).only('ceo_id', 'ceo', 'slug'):
-                person_map[person.ceo] = person
-                self.person_cache[person.ceo] = person
-        return person_map
-
     # =========================================================================
     # МЕТОДЫ ДЛЯ МАССОВОГО СОЗДАНИЯ ОРГАНИЗАЦИЙ
     # =========================================================================
@@ -751,6 +1066,12 @@ class BaseFIPSParser:
         
         self.stdout.write(f"      Всего уникальных организаций для обработки: {total_names}")
         
+        # ШАГ 0: Организации, найденные или созданные в предыдущих пачках/годах
+        all_names = self._take_cached_entities(all_names, self.organization_cache, org_map)
+        if not all_names:
+            self.stdout.write(f"      ✅ Обработано организаций: {len(org_map)} (все из кэша)")
+            return org_map
+        
         # ШАГ 1: Поиск существующих организаций
         self.stdout.write(f"      Поиск существующих организаций в БД...")
         
@@ -779,17 +1100,28 @@ class BaseFIPSParser:
         Поиск существующих организаций в БД
         """
         existing_orgs = {}
-        batch_size = 100
         
-        for i in range(0, len(names), batch_size):
-            batch_names = names[i:i+batch_size]
+        if connection.vendor == 'postgresql':
+            # Один запрос с массивом имен вместо серии IN-списков
+            table = connection.ops.quote_name(Organization._meta.db_table)
+            for org in Organization.objects.raw(
+                f"SELECT organization_id, name, slug FROM {table} WHERE name = ANY(%s)", [names]
+            ):
+                existing_orgs[org.name] = org
+                self.organization_cache[org.name] = org
             
+            self.stdout.write(f"      Найдено существующих: {len(existing_orgs)}")
+            return existing_orgs
+        
+        processed = 0
+        for batch_names in batch_iterator(names, QUERY_BATCH_SIZE):
+            processed += len(batch_names)
             for org in Organization.objects.filter(name__in=batch_names).only('organization_id', 'name', 'slug'):
                 existing_orgs[org.name] = org
                 self.organization_cache[org.name] = org
             
-            if (i + len(batch_names)) % 500 == 0 or (i + len(batch_names)) >= len(names):
-                self.stdout.write(f"         Обработано {i + len(batch_names)}/{len(names)} названий")
+            if processed % 5000 == 0 or processed >= len(names):
+                self.stdout.write(f"         Обработано {processed}/{len(names)} названий")
         
         self.stdout.write(f"      Найдено существующих: {len(existing_orgs)}")
         return existing_orgs
@@ -800,30 +1132,20 @@ class BaseFIPSParser:
         """
         self.stdout.write(f"      Подготовка данных для создания...")
         
-        max_id = Organization.objects.aggregate(models.Max('organization_id'))['organization_id__max'] or 0
+        next_id = self._reserve_ids(Organization, 'organization_id', len(new_names))
         
         # Получаем все существующие slugs
-        existing_slugs = set(Organization.objects.values_list('slug', flat=True))
+        existing_slugs = self._get_slug_set(Organization)
         self.stdout.write(f"      Всего существующих slug: {len(existing_slugs)}")
         
         orgs_to_create = []
-        used_slugs_in_batch = set()
         
         for name in new_names:
             base_slug = slugify(name[:50]) or 'organization'
-            unique_slug = base_slug
-            counter = 1
-            
-            # Проверяем И существующие slugs, И уже использованные в этом батче
-            while unique_slug in existing_slugs or unique_slug in used_slugs_in_batch:
-                unique_slug = f"{base_slug}-{counter}"
-                counter += 1
-            
-            used_slugs_in_batch.add(unique_slug)
-            existing_slugs.add(unique_slug)
+            unique_slug = self._generate_unique_slug(base_slug, Organization)
             
             org = Organization(
-                organization_id=max_id + len(orgs_to_create) + 1,
+                organization_id=next_id + len(orgs_to_create),
                 name=name,
                 full_name=name,
                 short_name=name[:500] if len(name) > 500 else name,
@@ -839,53 +1161,97 @@ class BaseFIPSParser:
     def _bulk_create_organizations(self, orgs_to_create: List[Organization], total_count: int) -> Dict[str, Organization]:
         """
         Массовое создание организаций с обработкой ошибок
+        
+        organization_id и slug назначаются заранее, а пересечения с БД
+        отфильтровываются перед вставкой, поэтому созданные объекты сразу
+        идут в маппинг без повторного SELECT.
         """
         org_map = {}
-        batch_size = 500
         created_count = 0
         
-        for batch in batch_iterator(orgs_to_create, batch_size):
+        # Небольшая пачка: при ошибке она уходит в создание по одному,
+        # и одна конфликтная строка не стоит тысяч одиночных INSERT
+        BATCH_SIZE = 500
+        
+        for batch in batch_iterator(orgs_to_create, BATCH_SIZE):
+            batch, existing_by_name = self._filter_duplicate_organizations(batch)
+            org_map.update(existing_by_name)
+            if not batch:
+                continue
+            
             try:
-                # Пробуем создать пачкой с ignore_conflicts
-                Organization.objects.bulk_create(batch, batch_size=batch_size, ignore_conflicts=True)
-                created_count += len(batch)
+                Organization.objects.bulk_create(batch, batch_size=self._insert_batch_size(Organization))
+                created = batch
             except Exception as e:
                 self.stdout.write(f"         Ошибка при создании батча: {e}")
                 # В случае ошибки создаем по одному
+                created = []
                 for org in batch:
                     try:
-                        org.save()
-                        created_count += 1
+                        org.save(force_insert=True)
+                        created.append(org)
+                    except IntegrityError as e2:
+                        self.stdout.write(f"         Конфликт при создании организации {org.name}: {e2}")
                     except Exception as e2:
                         self.stdout.write(f"         Не удалось создать организацию {org.name}: {e2}")
             
+            for org in created:
+                org_map[org.name] = org
+                self.organization_cache[org.name] = org
+            created_count += len(created)
+            
             if created_count % 5000 == 0 or created_count == total_count:
                 percent = (created_count / total_count) * 100 if total_count > 0 else 0
                 self.stdout.write(f"         Создано {created_count}/{total_count} ({percent:.1f}%)")
         
-        # Получаем созданные организации для маппинга
-        if created_count > 0:
-            created_names = [o.name for o in orgs_to_create[:created_count]]
-            org_map = self._fetch_created_organizations(created_names)
-        
         return org_map
 
-    def _fetch_created_organizations(self, names: List[str]) -> Dict[str, Organization]:
+    def _filter_duplicate_organizations(
+        self, batch: List[Organization]
+    ) -> Tuple[List[Organization], Dict[str, Organization]]:
         """
-        Получение созданных организаций из БД для маппинга
+        Фильтрация дубликатов в пачке по organization_id, name и slug
+        
+        Returns:
+            Tuple[пачка без конфликтов, {name: уже существующая Organization}]
         """
-        org_map = {}
-        for batch in batch_iterator(names, 1000):
-            for org in Organization.objects.filter(name__in=batch).only('organization_id', 'name', 'slug'):
-                org_map[org.name] = org
-                self.organization_cache[org.name] = org
-        return org_map
+        batch_ids = [o.organization_id for o in batch]
+        batch_names = [o.name for o in batch]
+        batch_slugs = [o.slug for o in batch]
+        
+        existing_by_id = set(
+            Organization.objects.filter(organization_id__in=batch_ids).values_list('organization_id', flat=True)
+        )
+        existing_by_name = {
+            org.name: org
+            for org in Organization.objects.filter(name__in=batch_names).only('organization_id', 'name', 'slug')
+        }
+        existing_by_slug = set(Organization.objects.filter(slug__in=batch_slugs).values_list('slug', flat=True))
+        
+        for name, org in existing_by_name.items():
+            self.organization_cache[name] = org
+        
+        if existing_by_id or existing_by_name or existing_by_slug:
+            self.stdout.write(self.style.WARNING(f"         Найдены дубликаты в пачке:"))
+            if existing_by_id:
+                self.stdout.write(self.style.WARNING(f"            по organization_id: {list(existing_by_id)[:5]}..."))
+            if existing_by_name:
+                self.stdout.write(self.style.WARNING(f"            по name: {list(existing_by_name)[:5]}..."))
+            if existing_by_slug:
+                self.stdout.write(self.style.WARNING(f"            по slug: {list(existing_by_slug)[:5]}..."))
+            
+            batch = [o for o in batch
+                    if o.organization_id not in existing_by_id
+                    and o.name not in existing_by_name
+                    and o.slug not in existing_by_slug]
+        
+        return batch, existing_by_name
 
     # =========================================================================
     # МЕТОДЫ ДЛЯ РАБОТЫ СО СВЯЗЯМИ (ОБЩИЕ ДЛЯ ВСЕХ ПАРСЕРОВ)
     # =========================================================================
 
-    def _process_relations_dataframe(self, relations_data: List[Dict], reg_to_ip: Dict):
+    def _process_relations_dataframe(self, relations_data: RelationsBuffer, reg_to_ip: Dict):
         """
         Обработка всех связей через единый DataFrame
         Этот метод может быть переопределен в дочерних классах при необходимости
@@ -895,20 +1261,22 @@ class BaseFIPSParser:
             return
 
         self.stdout.write("   Создание DataFrame связей")
-        df_relations = pd.DataFrame(relations_data)
+        df_relations = relations_data.to_dataframe()
         
         self.stdout.write(f"   Всего записей связей: {len(df_relations)}")
-        self.stdout.write(f"   Уникальных регистрационных номеров: {df_relations['reg_number'].nunique()}")
+        self.stdout.write(f"   Уникальных регистрационных номеров: {relations_data.reg_number_count}")
 
         self.stdout.write("   Добавление ID объектов")
-        df_relations['ip_id'] = df_relations['reg_number'].map(reg_to_ip)
+        ip_id = df_relations['reg_number'].map(reg_to_ip)
+        mask = ip_id.notna()
 
-        missing_ip = df_relations['ip_id'].isna().sum()
-        if missing_ip > 0:
+        # Маска считается один раз, без промежуточной копии через dropna().copy()
+        if not mask.all():
+            missing_ip = int((~mask).sum())
             self.stdout.write(self.style.WARNING(f"   ⚠️ Пропущено {missing_ip} связей с отсутствующими ID объектов"))
-            df_relations = df_relations.dropna(subset=['ip_id']).copy()
-        
-        df_relations['ip_id'] = df_relations['ip_id'].astype(int)
+            df_relations = df_relations.loc[mask]
+
+        df_relations = df_relations.assign(ip_id=ip_id[mask].astype(np.int64))
 
         # Определение типов для правообладателей
         self.stdout.write("   Определение типов сущностей через Natasha")
@@ -947,15 +1315,20 @@ class BaseFIPSParser:
         # Подготовка связей
         self.stdout.write("   Подготовка связей для вставки в БД")
 
-        authors_df = df_relations[df_relations['relation_type'] == 'author'].copy()
-        holders_df = df_relations[df_relations['relation_type'] == 'holder'].copy()
+        relation_type = df_relations['relation_type']
+        authors_df = df_relations.loc[relation_type.eq('author'), ['ip_id', 'entity_name']]
+        holders_df = df_relations.loc[relation_type.eq('holder'), ['ip_id', 'entity_name', 'entity_type']]
+
+        # Маппинги имя -> ID строятся один раз и используются во всех map()
+        person_id_map = {name: p.ceo_id for name, p in person_map.items()}
+        org_id_map = {name: o.organization_id for name, o in org_map.items()}
 
         # Авторы
-        author_relations = self._prepare_author_relations(authors_df, person_map)
+        author_relations = self._prepare_author_relations(authors_df, person_id_map)
         
         # Правообладатели (люди и организации)
         holder_person_relations, holder_org_relations = self._prepare_holder_relations(
-            holders_df, person_map, org_map
+            holders_df, person_id_map, org_id_map
         )
 
         # Создание связей
@@ -963,163 +1336,255 @@ class BaseFIPSParser:
 
         self.stdout.write(self.style.SUCCESS("   ✅ Обработка всех связей завершена"))
 
-    def _prepare_author_relations(self, authors_df: pd.DataFrame, person_map: Dict) -> List[Tuple[int, int]]:
+    def _map_relation_ids(self, df: pd.DataFrame, id_map: Dict[str, int]) -> RelationArrays:
+        """
+        Перевод связей (ip_id, entity_name) в два массива int64: ip_ids и entity_ids
+
+        Связи, для которых сущность не найдена в id_map, отбрасываются.
+        """
+        entity_ids = df['entity_name'].map(id_map)
+        mask = entity_ids.notna().to_numpy()
+        return (
+            df['ip_id'].to_numpy(dtype=np.int64)[mask],
+            entity_ids.to_numpy()[mask].astype(np.int64),
+        )
+
+    def _prepare_author_relations(self, authors_df: pd.DataFrame, person_id_map: Dict[str, int]) -> RelationArrays:
         """Подготовка связей авторов"""
         if authors_df.empty:
-            return []
-        
-        person_id_map = {name: p.ceo_id for name, p in person_map.items()}
-        authors_df['person_id'] = authors_df['entity_name'].map(person_id_map)
-        authors_df = authors_df.dropna(subset=['person_id'])
-        authors_df['person_id'] = authors_df['person_id'].astype(int)
+            return EMPTY_RELATIONS
         
-        authors_unique = authors_df[['ip_id', 'person_id']].drop_duplicates()
-        relations = [(row['ip_id'], row['person_id']) for _, row in authors_unique.iterrows()]
+        relations = self._map_relation_ids(authors_df, person_id_map)
         
-        self.stdout.write(f"   Подготовлено {len(relations)} уникальных связей авторов")
+        self.stdout.write(f"   Подготовлено {len(relations[0])} уникальных связей авторов")
         return relations
 
-    def _prepare_holder_relations(self, holders_df: pd.DataFrame, person_map: Dict, org_map: Dict) -> Tuple[List[Tuple[int, int]], List[Tuple[int, int]]]:
+    def _prepare_holder_relations(self, holders_df: pd.DataFrame, person_id_map: Dict[str, int], org_id_map: Dict[str, int]) -> Tuple[RelationArrays, RelationArrays]:
         """Подготовка связей правообладателей"""
-        person_relations = []
-        org_relations = []
+        person_relations = EMPTY_RELATIONS
+        org_relations = EMPTY_RELATIONS
 
         if holders_df.empty:
             return person_relations, org_relations
 
         # Правообладатели-люди
-        holders_persons = holders_df[holders_df['entity_type'] == 'person'].copy()
+        entity_type = holders_df['entity_type']
+        holders_persons = holders_df.loc[entity_type.eq('person'), ['ip_id', 'entity_name']]
         if not holders_persons.empty:
-            person_id_map = {name: p.ceo_id for name, p in person_map.items()}
-            holders_persons['person_id'] = holders_persons['entity_name'].map(person_id_map)
-            holders_persons = holders_persons.dropna(subset=['person_id'])
-            holders_persons['person_id'] = holders_persons['person_id'].astype(int)
-            
-            holders_persons_unique = holders_persons[['ip_id', 'person_id']].drop_duplicates()
-            person_relations = [(row['ip_id'], row['person_id']) for _, row in holders_persons_unique.iterrows()]
-            self.stdout.write(f"   Подготовлено {len(person_relations)} связей правообладателей-людей")
+            person_relations = self._map_relation_ids(holders_persons, person_id_map)
+            self.stdout.write(f"   Подготовлено {len(person_relations[0])} связей правообладателей-людей")
 
         # Правообладатели-организации
-        holders_orgs = holders_df[holders_df['entity_type'] == 'organization'].copy()
+        holders_orgs = holders_df.loc[entity_type.eq('organization'), ['ip_id', 'entity_name']]
         if not holders_orgs.empty:
-            org_id_map = {name: o.organization_id for name, o in org_map.items()}
-            holders_orgs['org_id'] = holders_orgs['entity_name'].map(org_id_map)
-            holders_orgs = holders_orgs.dropna(subset=['org_id'])
-            holders_orgs['org_id'] = holders_orgs['org_id'].astype(int)
-            
-            holders_orgs_unique = holders_orgs[['ip_id', 'org_id']].drop_duplicates()
-            org_relations = [(row['ip_id'], row['org_id']) for _, row in holders_orgs_unique.iterrows()]
-            self.stdout.write(f"   Подготовлено {len(org_relations)} связей правообладателей-организаций")
+            org_relations = self._map_relation_ids(holders_orgs, org_id_map)
+            self.stdout.write(f"   Подготовлено {len(org_relations[0])} связей правообладателей-организаций")
 
         return person_relations, org_relations
 
-    def _create_all_relations(self, author_relations: List[Tuple[int, int]], 
-                             holder_person_relations: List[Tuple[int, int]], 
-                             holder_org_relations: List[Tuple[int, int]]):
+    def _create_all_relations(self, author_relations: RelationArrays, 
+                             holder_person_relations: RelationArrays, 
+                             holder_org_relations: RelationArrays):
         """Создание всех типов связей"""
-        if author_relations:
-            self.stdout.write("   Создание связей авторов")
-            ip_ids = list(set(ip_id for ip_id, _ in author_relations))
-            with tqdm(total=len(ip_ids), desc="   Удаление старых связей авторов", unit="ip") as pbar:
-                self._delete_author_relations(ip_ids, pbar)
-            
-            with tqdm(total=len(author_relations), desc="   Создание новых связей авторов", unit="св") as pbar:
-                self._create_author_relations(author_relations, pbar)
-
-        if holder_person_relations:
-            self.stdout.write("   Создание связей правообладателей (люди)")
-            ip_ids = list(set(ip_id for ip_id, _ in holder_person_relations))
-            with tqdm(total=len(ip_ids), desc="   Удаление старых связей", unit="ip") as pbar:
-                self._delete_holder_person_relations(ip_ids, pbar)
-            
-            with tqdm(total=len(holder_person_relations), desc="   Создание новых связей", unit="св") as pbar:
-                self._create_holder_person_relations(holder_person_relations, pbar)
-
-        if holder_org_relations:
-            self.stdout.write("   Создание связей правообладателей (организации)")
-            ip_ids = list(set(ip_id for ip_id, _ in holder_org_relations))
-            with tqdm(total=len(ip_ids), desc="   Удаление старых связей", unit="ip") as pbar:
-                self._delete_holder_org_relations(ip_ids, pbar)
-            
-            with tqdm(total=len(holder_org_relations), desc="   Создание новых связей", unit="св") as pbar:
-                self._create_holder_org_relations(holder_org_relations, pbar)
+        tasks = []
+        if len(author_relations[0]):
+            tasks.append((IPObject.authors.through, 'person_id', author_relations, "авторов"))
+        if len(holder_person_relations[0]):
+            tasks.append((IPObject.owner_persons.through, 'person_id', holder_person_relations,
+                          "правообладателей-людей"))
+        if len(holder_org_relations[0]):
+            tasks.append((IPObject.owner_organizations.through, 'organization_id', holder_org_relations,
+                          "правообладателей-организаций"))
+
+        # SQLite допускает только одного писателя, поэтому там таблицы
+        # связей пишутся последовательно. На серверных СУБД три независимые
+        # связующие таблицы пишутся параллельно, каждая в своем соединении
+        if connection.vendor == 'sqlite' or len(tasks) < 2:
+            with self._bulk_load_transaction():
+                for task in tasks:
+                    self.stdout.write(f"   Создание связей {task[3]}")
+                    self._sync_relations(*task)
+            return
 
-    # Методы для удаления связей
-    def _delete_author_relations(self, ip_ids: List[int], pbar):
-        """Удаление связей авторов"""
-        delete_batch_size = 500
-        for i in range(0, len(ip_ids), delete_batch_size):
-            batch_ids = ip_ids[i:i+delete_batch_size]
-            IPObject.authors.through.objects.filter(
-                ipobject_id__in=batch_ids
-            ).delete()
-            pbar.update(len(batch_ids))
+        self.stdout.write(f"   Параллельное создание связей ({len(tasks)} таблицы)")
+        with ThreadPoolExecutor(max_workers=len(tasks)) as executor:
+            futures = [executor.submit(self._sync_relations_in_thread, *task) for task in tasks]
+            for future in futures:
+                future.result()
 
-    def _delete_holder_person_relations(self, ip_ids: List[int], pbar):
-        """Удаление связей правообладателей-людей"""
-        delete_batch_size = 500
-        for i in range(0, len(ip_ids), delete_batch_size):
-            batch_ids = ip_ids[i:i+delete_batch_size]
-            IPObject.owner_persons.through.objects.filter(
-                ipobject_id__in=batch_ids
-            ).delete()
-            pbar.update(len(batch_ids))
+    def _sync_relations_in_thread(self, *args):
+        """Синхронизация связей в отдельном потоке со своим соединением с БД"""
+        try:
+            with self._bulk_load_transaction():
+                self._sync_relations(*args)
+        finally:
+            connection.close()
+
+    @contextmanager
+    def _bulk_load_transaction(self):
+        """
+        Одна транзакция на всю пакетную загрузку вместо автокоммита каждой пачки
+
+        На PostgreSQL дополнительно отключается synchronous_commit (SET LOCAL
+        действует только до конца транзакции): загрузка повторяема, поэтому
+        ожидание записи WAL на диск при коммите не требуется.
+        """
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute("SET LOCAL synchronous_commit = OFF")
+            yield
+
+    def _sync_relations(self, through_model, entity_field: str, relations: RelationArrays, label: str,
+                        ip_ids: Optional[List[int]] = None):
+        """
+        Синхронизация связей по разнице множеств
 
-    def _delete_holder_org_relations(self, ip_ids: List[int], pbar):
-        """Удаление связей правообладателей-организаций"""
-        delete_batch_size = 500
-        for i in range(0, len(ip_ids), delete_batch_size):
-            batch_ids = ip_ids[i:i+delete_batch_size]
-            IPObject.owner_organizations.through.objects.filter(
-                ipobject_id__in=batch_ids
-            ).delete()
+        Вместо полного удаления и повторной вставки связей для всех ip_id
+        удаляются только исчезнувшие пары, а вставляются только новые.
+        Неизменившиеся связи остаются в таблице нетронутыми.
+
+        Args:
+            ip_ids: объекты, связи которых сверяются с БД. По умолчанию -
+                объекты из relations; если передать больше, у объектов без
+                новых пар все старые связи будут удалены
+        """
+        relation_ip_ids, entity_ids = relations
+        if ip_ids is None:
+            ip_ids = np.unique(relation_ip_ids).tolist()
+        existing_row_ids, existing_ip_ids, existing_entity_ids = self._fetch_existing_relations(
+            through_model, entity_field, ip_ids
+        )
+
+        # Пара (ip_id, entity_id) упаковывается в один ключ int64, поэтому
+        # дедупликация и сверка с БД идут в numpy, а не через set кортежей
+        stride = int(max(entity_ids.max(initial=0), existing_entity_ids.max(initial=0))) + 1
+        new_keys = np.unique(self._pack_relation_keys(relation_ip_ids, entity_ids, stride))
+        existing_keys = self._pack_relation_keys(existing_ip_ids, existing_entity_ids, stride)
+
+        duplicates = len(relation_ip_ids) - len(new_keys)
+        if duplicates:
+            self.stdout.write(f"   Связи {label}: отброшено дубликатов {duplicates} "
+                             f"({duplicates / len(relation_ip_ids):.1%})")
+
+        # Ключи из np.unique упорядочены по ipobject_id: соседние вставки попадают
+        # в соседние страницы индекса (ipobject_id, entity_id), а не в случайные
+        stale = ~np.isin(existing_keys, new_keys, assume_unique=True)
+        to_delete = np.sort(existing_row_ids[stale]).tolist()
+        create_keys = new_keys[~np.isin(new_keys, existing_keys, assume_unique=True)]
+        to_create = list(zip((create_keys // stride).tolist(), (create_keys % stride).tolist()))
+
+        if not to_delete and not to_create:
+            # Повторный импорт тех же данных: связи в БД уже совпадают
+            self.stdout.write(f"   Связи {label}: без изменений ({len(new_keys)}), запись пропущена")
+            return
+
+        self.stdout.write(f"   Связи {label}: новых={len(to_create)}, удаляемых={len(to_delete)}, "
+                         f"без изменений={len(new_keys) - len(to_create)}")
+
+        if to_delete:
+            with tqdm(total=len(to_delete), desc="   Удаление старых связей", unit="св",
+                      mininterval=0.5) as pbar:
+                self._delete_relations(through_model, to_delete, pbar)
+
+        if to_create:
+            with tqdm(total=len(to_create), desc="   Создание новых связей", unit="св",
+                      mininterval=0.5) as pbar:
+                # Пары сверены с БД и дедуплицированы через np.unique, но другой
+                # импорт мог успеть вставить те же пары - они пропускаются
+                self._create_relations(through_model, entity_field, to_create, pbar)
+
+    def _pack_relation_keys(self, ip_ids: np.ndarray, entity_ids: np.ndarray, stride: int) -> np.ndarray:
+        """Упаковка пар (ip_id, entity_id) в ключи int64: ip_id * stride + entity_id"""
+        if len(ip_ids) and int(ip_ids.max()) >= np.iinfo(np.int64).max // stride:
+            raise ValueError(f"ID связей не помещаются в ключ int64 (stride={stride})")
+        return ip_ids.astype(np.int64) * stride + entity_ids
+
+    def _fetch_existing_relations(self, through_model, entity_field: str, ip_ids: List[int]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Загрузка существующих связей: массивы int64 (id строки связи, ip_id, entity_id)"""
+        rows = []
+        queryset = through_model.objects.values_list('id', 'ipobject_id', entity_field)
+        for batch_ids in batch_iterator(ip_ids, QUERY_BATCH_SIZE):
+            rows.extend(queryset.filter(ipobject_id__in=batch_ids))
+        existing = np.array(rows, dtype=np.int64).reshape(-1, 3)
+        return existing[:, 0], existing[:, 1], existing[:, 2]
+
+    # Методы для удаления связей
+    def _delete_relations(self, through_model, row_ids: List[int], pbar):
+        """Удаление связей по id строк связующей таблицы"""
+        if connection.vendor == 'postgresql':
+            # Один текст запроса с массивом в параметре вместо IN-списков разной длины
+            table = connection.ops.quote_name(through_model._meta.db_table)
+            delete_batch_size = 50000
+            with connection.cursor() as cursor:
+                for batch_ids in batch_iterator(row_ids, delete_batch_size):
+                    cursor.execute(f"DELETE FROM {table} WHERE id = ANY(%s)", [batch_ids])
+                    pbar.update(len(batch_ids))
+            return
+
+        manager = through_model.objects
+        for batch_ids in batch_iterator(row_ids, QUERY_BATCH_SIZE):
+            manager.filter(id__in=batch_ids).delete()
             pbar.update(len(batch_ids))
 
     # Методы для создания связей
-    def _create_author_relations(self, relations: List[Tuple[int, int]], pbar):
-        """Создание связей авторов"""
-        create_batch_size = 2000
-        for batch in batch_iterator(relations, create_batch_size):
-            through_objs = [
-                IPObject.authors.through(
-                    ipobject_id=ip_id,
-                    person_id=person_id
-                )
-                for ip_id, person_id in batch
-            ]
-            IPObject.authors.through.objects.bulk_create(
-                through_objs, batch_size=2000, ignore_conflicts=True
-            )
-            pbar.update(len(batch))
-
-    def _create_holder_person_relations(self, relations: List[Tuple[int, int]], pbar):
-        """Создание связей правообладателей-людей"""
-        create_batch_size = 2000
-        for batch in batch_iterator(relations, create_batch_size):
-            through_objs = [
-                IPObject.owner_persons.through(
-                    ipobject_id=ip_id,
-                    person_id=person_id
-                )
-                for ip_id, person_id in batch
-            ]
-            IPObject.owner_persons.through.objects.bulk_create(
-                through_objs, batch_size=2000, ignore_conflicts=True
+    def _create_relations(self, through_model, entity_field: str, relations: List[Tuple[int, int]], pbar):
+        """
+        Создание связей в связующей таблице
+
+        Уже существующие пары пропускаются (ON CONFLICT DO NOTHING)
+        """
+        if connection.vendor == 'postgresql' and self._copy_relations(
+            through_model, entity_field, relations, pbar
+        ):
+            return
+
+        # Кортежи вставляются напрямую через executemany, без создания
+        # экземпляров through-модели на каждую связь.
+        # ON CONFLICT DO NOTHING поддерживают и SQLite (3.24+), и PostgreSQL
+        table = connection.ops.quote_name(through_model._meta.db_table)
+        column = connection.ops.quote_name(entity_field)
+        sql = f"INSERT INTO {table} (ipobject_id, {column}) VALUES (%s, %s) ON CONFLICT DO NOTHING"
+
+        with connection.cursor() as cursor:
+            for batch in batch_iterator(relations, BULK_BATCH_SIZE):
+                cursor.executemany(sql, batch)
+                pbar.update(len(batch))
+
+    def _copy_relations(self, through_model, entity_field: str, relations: List[Tuple[int, int]], pbar) -> bool:
+        """
+        Загрузка связей через COPY FROM STDIN (PostgreSQL + psycopg 3)
+
+        COPY не поддерживает ON CONFLICT, поэтому строки копируются во
+        временную таблицу и переносятся в связующую одним
+        INSERT ... SELECT ... ON CONFLICT DO NOTHING.
+
+        Returns:
+            False, если драйвер не поддерживает COPY (psycopg2) и нужно
+            использовать обычную вставку через executemany
+        """
+        table = connection.ops.quote_name(through_model._meta.db_table)
+        column = connection.ops.quote_name(entity_field)
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            if not hasattr(cursor.cursor, 'copy'):
+                return False
+
+            cursor.execute(
+                f"CREATE TEMP TABLE relations_load (ipobject_id bigint, {column} bigint) ON COMMIT DROP"
             )
-            pbar.update(len(batch))
-
-    def _create_holder_org_relations(self, relations: List[Tuple[int, int]], pbar):
-        """Создание связей правообладателей-организаций"""
-        create_batch_size = 2000
-        for batch in batch_iterator(relations, create_batch_size):
-            through_objs = [
-                IPObject.owner_organizations.through(
-                    ipobject_id=ip_id,
-                    organization_id=org_id
-                )
-                for ip_id, org_id in batch
-            ]
-            IPObject.owner_organizations.through.objects.bulk_create(
-                through_objs, batch_size=2000, ignore_conflicts=True
+            with cursor.cursor.copy(f"COPY relations_load (ipobject_id, {column}) FROM STDIN") as copy:
+                for batch in batch_iterator(relations, BULK_BATCH_SIZE):
+                    for row in batch:
+                        copy.write_row(row)
+                    pbar.update(len(batch))
+            cursor.execute(
+                f"INSERT INTO {table} (ipobject_id, {column}) "
+                f"SELECT ipobject_id, {column} FROM relations_load "
+                f"ON CONFLICT DO NOTHING"
             )
-            pbar.update(len(batch))
\ No newline at end of file
+            # ON COMMIT DROP срабатывает только при коммите внешней транзакции,
+            # а в ней связи могут загружаться несколько раз
+            cursor.execute("DROP TABLE relations_load")
+
+        return True
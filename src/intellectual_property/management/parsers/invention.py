@@ -4,7 +4,6 @@
 """
 
 import logging
-import gc
 from typing import Dict, List, Tuple, Any, Optional
 from collections import defaultdict
 
@@ -13,8 +12,9 @@ from django.db import models, transaction
 from tqdm import tqdm
 
 from intellectual_property.models import IPObject, IPType
-from .base import BaseFIPSParser
+from .base import BaseFIPSParser, OBJECT_BATCH_SIZE, QUERY_BATCH_SIZE
 from ..utils.progress import batch_iterator
+from ..utils.relations import RelationsBuffer
 
 logger = logging.getLogger(__name__)
 
@@ -33,27 +33,51 @@ class InventionParser(BaseFIPSParser):
         """Возвращает список обязательных колонок для CSV"""
         return ['registration number', 'invention name']
 
+    def get_used_columns(self):
+        """Возвращает список колонок CSV, которые читает парсер"""
+        return [
+            'registration number', 'invention name', 'application date', 'registration date',
+            'patent starting date', 'expiration date', 'actual', 'publication URL', 'abstract',
+            'claims', 'authors', 'patent holders',
+        ]
+
+    def get_object_fields(self):
+        """Поля IPObject, которые парсер заполняет и сравнивает с записью в БД"""
+        return [
+            'ip_type_id', 'name', 'application_date', 'registration_date', 'patent_starting_date',
+            'expiration_date', 'actual', 'publication_url', 'abstract', 'claims', 'creation_year',
+        ]
+
     def _has_data_changed(self, obj, new_data):
         """
         Проверяет, изменились ли данные объекта
-        """
-        fields_to_check = [
-            ('name', obj.name, new_data['name']),
-            ('application_date', obj.application_date, new_data['application_date']),
-            ('registration_date', obj.registration_date, new_data['registration_date']),
-            ('patent_starting_date', obj.patent_starting_date, new_data['patent_starting_date']),
-            ('expiration_date', obj.expiration_date, new_data['expiration_date']),
-            ('actual', obj.actual, new_data['actual']),
-            ('publication_url', obj.publication_url, new_data['publication_url']),
-            ('abstract', obj.abstract, new_data['abstract']),
-            ('claims', obj.claims, new_data['claims']),
-            ('creation_year', obj.creation_year, new_data['creation_year']),
-        ]
 
-        for field_name, old_val, new_val in fields_to_check:
-            if old_val != new_val:
-                return True
-        return False
+        obj - словарь полей существующей записи из load_existing_objects
+        """
+        # Сравнение кортежей выполняется на уровне C и прерывается на первом отличии
+        return (
+            obj['name'],
+            obj['application_date'],
+            obj['registration_date'],
+            obj['patent_starting_date'],
+            obj['expiration_date'],
+            obj['actual'],
+            obj['publication_url'],
+            obj['abstract'],
+            obj['claims'],
+            obj['creation_year'],
+        ) != (
+            new_data['name'],
+            new_data['application_date'],
+            new_data['registration_date'],
+            new_data['patent_starting_date'],
+            new_data['expiration_date'],
+            new_data['actual'],
+            new_data['publication_url'],
+            new_data['abstract'],
+            new_data['claims'],
+            new_data['creation_year'],
+        )
 
     def parse_dataframe(self, df, catalogue, year=None):
         """
@@ -94,8 +118,14 @@ class InventionParser(BaseFIPSParser):
         reg_num_to_row = {}
         skipped_empty = 0
         
-        for idx, row in df.iterrows():
-            reg_num = self.clean_string(row.get('registration number'))
+        # Все колонки очищаются векторно один раз, дальше значения берутся как есть
+        df = self.clean_dataframe(df)
+        df = self.parse_date_columns(df, [
+            'application date', 'registration date', 'patent starting date', 'expiration date',
+        ])
+        df = self.parse_bool_columns(df, ['actual'])
+        
+        for reg_num, row in zip(df['registration number'].tolist(), self.iter_rows(df)):
             if reg_num:
                 reg_num_to_row[reg_num] = row
             else:
@@ -108,21 +138,7 @@ class InventionParser(BaseFIPSParser):
         # =====================================================================
         self.stdout.write("🔹 Загрузка существующих записей из БД")
         
-        existing_objects = {}
-        batch_size = 500
-        reg_numbers = list(reg_num_to_row.keys())
-        
-        with tqdm(total=len(reg_numbers), desc="Загрузка пачками", unit="зап") as pbar:
-            for i in range(0, len(reg_numbers), batch_size):
-                batch_numbers = reg_numbers[i:i+batch_size]
-                
-                for obj in IPObject.objects.filter(
-                    registration_number__in=batch_numbers,
-                    ip_type=ip_type
-                ).select_related('ip_type'):
-                    existing_objects[obj.registration_number] = obj
-                
-                pbar.update(len(batch_numbers))
+        existing_objects = self.load_existing_objects(ip_type, list(reg_num_to_row.keys()))
 
         self.stdout.write(f"🔹 Найдено в БД: {len(existing_objects)}")
 
@@ -137,32 +153,35 @@ class InventionParser(BaseFIPSParser):
         unchanged_count = 0
         error_reg_numbers = []
 
-        relations_data = []
+        relations_data = RelationsBuffer()
         
-        with tqdm(total=len(reg_num_to_row), desc="Подготовка данных IPObject", unit="зап") as pbar:
+        # update(1) вызывается на каждую запись, поэтому перерисовка
+        # прогресса проверяется не чаще раза в 1000 записей и 0.5 с
+        with tqdm(total=len(reg_num_to_row), desc="Подготовка данных IPObject", unit="зап",
+                  mininterval=0.5, miniters=1000) as pbar:
             for reg_num, row in reg_num_to_row.items():
                 try:
                     if not self.command.force and upload_date and reg_num in existing_objects:
                         existing = existing_objects[reg_num]
-                        if existing.updated_at and existing.updated_at.date() >= upload_date:
+                        if existing['updated_at'] and existing['updated_at'].date() >= upload_date:
                             skipped_by_date.append(reg_num)
                             pbar.update(1)
                             continue
 
-                    name = self.clean_string(row.get('invention name'))
+                    name = row.get('invention name', '')
                     if name:
-                        name = self.rid_formatter.format(name)
+                        name = self.format_rid_name(name)
                     else:
                         name = f"Изобретение №{reg_num}"
 
-                    application_date = self.parse_date(row.get('application date'))
-                    registration_date = self.parse_date(row.get('registration date'))
-                    patent_starting_date = self.parse_date(row.get('patent starting date'))
-                    expiration_date = self.parse_date(row.get('expiration date'))
-                    actual = self.parse_bool(row.get('actual'))
-                    publication_url = self.clean_string(row.get('publication URL'))
-                    abstract = self.clean_string(row.get('abstract'))
-                    claims = self.clean_string(row.get('claims'))
+                    application_date = row.get('application date')
+                    registration_date = row.get('registration date')
+                    patent_starting_date = row.get('patent starting date')
+                    expiration_date = row.get('expiration date')
+                    actual = row.get('actual', False)
+                    publication_url = row.get('publication URL', '')
+                    abstract = row.get('abstract', '')
+                    claims = row.get('claims', '')
 
                     creation_year = None
                     if application_date:
@@ -195,29 +214,17 @@ class InventionParser(BaseFIPSParser):
 
                     # Авторы
                     authors_str = row.get('authors')
-                    if not pd.isna(authors_str) and authors_str:
+                    if authors_str:
                         authors = self.parse_authors(authors_str)
                         for author in authors:
-                            relations_data.append({
-                                'reg_number': reg_num,
-                                'entity_name': author['full_name'],
-                                'entity_type': 'person',
-                                'relation_type': 'author',
-                                'entity_data': author
-                            })
+                            relations_data.append(reg_num, author['full_name'], 'person', 'author')
 
                     # Патентообладатели
                     holders_str = row.get('patent holders')
-                    if not pd.isna(holders_str) and holders_str:
+                    if holders_str:
                         holders = self.parse_patent_holders(holders_str)
                         for holder in holders:
-                            relations_data.append({
-                                'reg_number': reg_num,
-                                'entity_name': holder,
-                                'entity_type': None,
-                                'relation_type': 'holder',
-                                'entity_data': {'full_name': holder}
-                            })
+                            relations_data.append(reg_num, holder, None, 'holder')
 
                 except Exception as e:
                     error_reg_numbers.append(reg_num)
@@ -241,37 +248,45 @@ class InventionParser(BaseFIPSParser):
         # =====================================================================
         # ШАГ 4: Создание/обновление IPObject
         # =====================================================================
-        if to_create and not self.command.dry_run:
-            self.stdout.write(f"🔹 Создание {len(to_create)} новых записей")
-            with tqdm(total=len(to_create), desc="Создание", unit="зап") as pbar:
-                stats['created'] = self._bulk_create_objects(to_create, pbar)
-
-        if to_update and not self.command.dry_run:
-            self.stdout.write(f"🔹 Обновление {len(to_update)} записей")
-            with tqdm(total=len(to_update), desc="Обновление", unit="зап") as pbar:
-                stats['updated'] = self._bulk_update_objects(to_update, existing_objects, pbar)
+        created_objects = {}
+        if (to_create or to_update) and not self.command.dry_run:
+            # Создание и обновление фиксируются одним коммитом, а не коммитом на пачку
+            with self._bulk_load_transaction():
+                if to_create:
+                    self.stdout.write(f"🔹 Создание {len(to_create)} новых записей")
+                    with tqdm(total=len(to_create), desc="Создание", unit="зап") as pbar:
+                        stats['created'] = self._bulk_create_objects(to_create, pbar, created_objects)
+
+                if to_update:
+                    self.stdout.write(f"🔹 Обновление {len(to_update)} записей")
+                    with tqdm(total=len(to_update), desc="Обновление", unit="зап") as pbar:
+                        stats['updated'] = self._bulk_update_objects(to_update, existing_objects, pbar)
 
         # =====================================================================
         # ШАГ 5: Получаем актуальный маппинг reg_number -> ip_id
         # =====================================================================
         self.stdout.write("🔹 Построение маппинга регистрационных номеров")
         
-        all_reg_numbers = list(set(
-            list(existing_objects.keys()) + 
-            [data['registration_number'] for data in to_create]
-        ))
+        # ID существующих и только что созданных объектов уже известны,
+        # из БД дочитываются только те, для которых bulk_create не вернул pk
+        reg_to_ip = {reg_num: obj['id'] for reg_num, obj in existing_objects.items()}
+        reg_to_ip.update(
+            (reg_num, obj.id) for reg_num, obj in created_objects.items() if obj.id is not None
+        )
+        missing_reg_numbers = list({
+            data['registration_number'] for data in to_create
+            if data['registration_number'] not in reg_to_ip
+        })
         
-        reg_to_ip = {}
-        with tqdm(total=len(all_reg_numbers), desc="Загрузка ID объектов", unit="зап") as pbar:
-            batch_size = 1000
-            for i in range(0, len(all_reg_numbers), batch_size):
-                batch_nums = all_reg_numbers[i:i+batch_size]
-                for obj in IPObject.objects.filter(
-                    registration_number__in=batch_nums,
-                    ip_type=ip_type
-                ).only('id', 'registration_number'):
-                    reg_to_ip[obj.registration_number] = obj.id
-                pbar.update(len(batch_nums))
+        if missing_reg_numbers:
+            with tqdm(total=len(missing_reg_numbers), desc="Загрузка ID объектов", unit="зап") as pbar:
+                for batch_nums in batch_iterator(missing_reg_numbers, QUERY_BATCH_SIZE):
+                    for obj in IPObject.objects.filter(
+                        registration_number__in=batch_nums,
+                        ip_type=ip_type
+                    ).only('id', 'registration_number'):
+                        reg_to_ip[obj.registration_number] = obj.id
+                    pbar.update(len(batch_nums))
 
         self.stdout.write(f"🔹 Загружено ID для {len(reg_to_ip)} объектов")
 
@@ -282,8 +297,6 @@ class InventionParser(BaseFIPSParser):
             self.stdout.write("🔹 Обработка связей")
             self._process_relations_dataframe(relations_data, reg_to_ip)
 
-        gc.collect()
-
         stats['processed'] = len(df) - stats['skipped'] - stats['errors']
 
         year_info = f" для {year} года" if year else ""
@@ -295,36 +308,52 @@ class InventionParser(BaseFIPSParser):
 
         return stats
 
-    def _bulk_create_objects(self, to_create: List[Dict], pbar) -> int:
-        """Пакетное создание объектов IPObject"""
-        created_count = 0
-        batch_size = 1000
+    def _bulk_create_objects(self, to_create: List[Dict], pbar, created_objects: Dict) -> int:
+        """
+        Пакетное создание объектов IPObject
 
-        for batch in batch_iterator(to_create, batch_size):
+        Созданные объекты складываются в created_objects
+        {registration_number: IPObject}. На PostgreSQL, SQLite 3.35+
+        и MariaDB 10.5+ bulk_create проставляет им pk, поэтому
+        повторно читать их из БД не нужно.
+        """
+        created_count = 0
+        for batch in batch_iterator(to_create, OBJECT_BATCH_SIZE):
             create_objects = [IPObject(**data) for data in batch]
-            IPObject.objects.bulk_create(create_objects, batch_size=batch_size)
+            IPObject.objects.bulk_create(create_objects, batch_size=self._insert_batch_size(IPObject))
+            for obj in create_objects:
+                created_objects[obj.registration_number] = obj
             created_count += len(batch)
             pbar.update(len(batch))
 
         return created_count
 
     def _bulk_update_objects(self, to_update: List[Dict], existing_objects: Dict, pbar) -> int:
-        """Пакетное обновление объектов IPObject"""
-        updated_count = 0
-        BATCH_UPDATE_SIZE = 500
-
-        for batch in batch_iterator(to_update, BATCH_UPDATE_SIZE):
-            with transaction.atomic():
-                for data in batch:
-                    obj = existing_objects[data['registration_number']]
-                    update_fields = []
-                    for field, value in data.items():
-                        if field != 'registration_number' and getattr(obj, field) != value:
-                            setattr(obj, field, value)
-                            update_fields.append(field)
-                    if update_fields:
-                        obj.save(update_fields=update_fields)
-                        updated_count += 1
+        """
+        Пакетное обновление объектов IPObject через bulk_update
+
+        Существующие записи хранятся словарями полей, поэтому для
+        bulk_update собираются новые экземпляры IPObject с pk записи
+        """
+        changed_objects = []
+        changed_fields = set()
+
+        for data in to_update:
+            existing = existing_objects[data['registration_number']]
+            obj_fields = [
+                field for field, value in data.items()
+                if field != 'registration_number' and existing[field] != value
+            ]
+            if obj_fields:
+                changed_objects.append(IPObject(pk=existing['id'], **data))
+                changed_fields.update(obj_fields)
+
+        # Записи без фактических изменений сразу засчитываются в прогресс
+        pbar.update(len(to_update) - len(changed_objects))
+
+        fields = sorted(changed_fields)
+        for batch in batch_iterator(changed_objects, OBJECT_BATCH_SIZE):
+            IPObject.objects.bulk_update(batch, fields=fields, batch_size=OBJECT_BATCH_SIZE)
             pbar.update(len(batch))
 
-        return updated_count
\ No newline at end of file
+        return len(changed_objects)
@@ -2,9 +2,34 @@
 Детектор типов сущностей с использованием Natasha и кэшированием
 """
 
+import os
+import re
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
 # ИСПРАВЛЕНО: импортируем из текущего пакета (.text_processor)
 from .text_processor import RussianTextProcessor
 
+# Число процессов для определения типов через Natasha (1 - без процессов).
+# Каждый процесс загружает свои модели Natasha, поэтому пул запускается
+# только для больших списков
+DETECT_WORKERS = int(os.environ.get('IP_DETECT_WORKERS', 1))
+DETECT_PARALLEL_MIN = 5000
+
+# Детектор внутри процесса пула, создается один раз при старте процесса
+_worker_detector = None
+
+
+def _init_worker():
+    """Инициализация процесса пула: загрузка моделей Natasha"""
+    global _worker_detector
+    _worker_detector = EntityTypeDetector()
+
+
+def _detect_in_worker(text: str) -> str:
+    """Определение типа в процессе пула"""
+    return _worker_detector._detect_uncached(text)
+
 
 class EntityTypeDetector:
     """
@@ -12,13 +37,22 @@ class EntityTypeDetector:
     Определяет, является ли текст именем человека или названием организации
     """
 
+    # Организационно-правовая форма в начале названия - однозначно организация,
+    # такие тексты не нужно прогонять через Natasha
+    ORG_PREFIX_RE = re.compile(
+        r'^\W*(ООО|ОАО|АО|ЗАО|ПАО|НАО|ФГУП|ГУП|МУП|ФГ[АБК]?О?У|НКО|АНО)\b'
+    )
+
     def __init__(self, cache_size: int = 50000):
         self.processor = RussianTextProcessor()
-        # Кэш для результатов, чтобы не вызывать Natasha повторно
-        self.cache = {}
+        # LRU-кэш результатов, чтобы не вызывать Natasha повторно
+        self.cache = OrderedDict()
         self.cache_size = cache_size
         self.cache_hits = 0
         self.cache_misses = 0
+        # Пул процессов создается при первом большом списке и живет до close():
+        # модели Natasha в процессах загружаются один раз, а не на каждую пачку CSV
+        self._pool = None
 
     def detect_type(self, text: str) -> str:
         """
@@ -36,16 +70,12 @@ class EntityTypeDetector:
         # Проверяем кэш
         if text in self.cache:
             self.cache_hits += 1
+            self.cache.move_to_end(text)
             return self.cache[text]
 
         self.cache_misses += 1
 
-        # Используем процессор с Natasha для определения
-        # is_person() внутри использует NER и другие методы Natasha
-        if self.processor.is_person(text):
-            result = 'person'
-        else:
-            result = 'organization'
+        result = self._detect_uncached(text)
 
         # Кэшируем результат с контролем размера
         self._add_to_cache(text, result)
@@ -69,29 +99,63 @@ class EntityTypeDetector:
         for text in texts:
             if text in self.cache:
                 result[text] = self.cache[text]
+                self.cache.move_to_end(text)
                 self.cache_hits += 1
             else:
                 to_process.append(text)
                 self.cache_misses += 1
 
         # Обрабатываем новые тексты
-        for text in to_process:
-            if self.processor.is_person(text):
-                result[text] = 'person'
-            else:
-                result[text] = 'organization'
-            self._add_to_cache(text, result[text])
+        for text, entity_type in zip(to_process, self._detect_many(to_process)):
+            result[text] = entity_type
+            self._add_to_cache(text, entity_type)
 
         return result
 
+    def _detect_many(self, texts: list):
+        """
+        Определение типов для списка текстов без обращения к кэшу
+
+        Natasha работает на чистом Python, поэтому большие списки
+        распределяются по процессам (IP_DETECT_WORKERS > 1).
+        """
+        if DETECT_WORKERS < 2 or len(texts) < DETECT_PARALLEL_MIN:
+            return [self._detect_uncached(text) for text in texts]
+
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=DETECT_WORKERS, initializer=_init_worker)
+        return list(self._pool.map(_detect_in_worker, texts, chunksize=200))
+
+    def close(self):
+        """Остановка пула процессов (если он был запущен)"""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def _detect_uncached(self, text: str) -> str:
+        """
+        Определение типа без обращения к кэшу
+
+        Названия с организационно-правовой формой в начале (ООО, АО, ФГБУ...)
+        классифицируются регулярным выражением, остальные - через Natasha
+        """
+        if self.ORG_PREFIX_RE.match(text):
+            return 'organization'
+
+        # is_person() внутри использует NER и другие методы Natasha
+        if self.processor.is_person(text):
+            return 'person'
+        return 'organization'
+
     def _add_to_cache(self, text: str, result: str):
         """
         Добавление результата в кэш с контролем размера
+
+        При переполнении вытесняется одна давно не использованная запись
+        за O(1), без копирования всего кэша.
         """
         if len(self.cache) >= self.cache_size:
-            # Очищаем 20% самых старых записей
-            items = list(self.cache.items())
-            self.cache = dict(items[-int(self.cache_size * 0.8):])
+            self.cache.popitem(last=False)
 
         self.cache[text] = result
 
@@ -2,13 +2,16 @@
 Утилиты для парсеров
 """
 
-from .csv_loader import load_csv_with_strategies
+from .csv_loader import load_csv_with_strategies, iter_csv_chunks
 from .filters import apply_filters
 from .progress import ProgressManager, batch_iterator
+from .relations import RelationsBuffer
 
 __all__ = [
     'load_csv_with_strategies',
+    'iter_csv_chunks',
     'apply_filters',
     'ProgressManager',
     'batch_iterator',
+    'RelationsBuffer',
 ]
\ No newline at end of file
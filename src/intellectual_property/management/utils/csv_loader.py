@@ -2,14 +2,14 @@
 Утилиты для загрузки CSV файлов
 """
 
+import codecs
+
 import pandas as pd
 
 
-def load_csv_with_strategies(file_path, encoding, delimiter, stdout=None):
-    """
-    Загрузка CSV с несколькими стратегиями
-    """
-    strategies = [
+def _get_strategies(encoding, delimiter):
+    """Список стратегий чтения CSV в порядке приоритета"""
+    return [
         {'encoding': encoding, 'delimiter': delimiter, 'skipinitialspace': True},
         {'encoding': 'cp1251', 'delimiter': delimiter, 'skipinitialspace': True},
         {'encoding': 'utf-8', 'delimiter': ';', 'skipinitialspace': True},
@@ -17,15 +17,129 @@ def load_csv_with_strategies(file_path, encoding, delimiter, stdout=None):
         {'encoding': 'utf-8', 'delimiter': '\t', 'skipinitialspace': True},
     ]
 
-    for strategy in strategies:
+
+def _clean_column_name(col):
+    """Очистка названия колонки от пробелов, BOM и кавычек"""
+    return col.strip().strip('\ufeff').strip('"')
+
+
+def _clean_columns(df):
+    """Очистка названий колонок от пробелов, BOM и кавычек"""
+    df.columns = [_clean_column_name(col) for col in df.columns]
+    return df
+
+
+def _usecols_filter(usecols):
+    """
+    Фильтр колонок для read_csv(usecols=...)
+
+    Сравнение идет по очищенному названию, поэтому колонки с BOM
+    или кавычками в заголовке тоже распознаются. None - читать все.
+    """
+    if usecols is None:
+        return None
+    wanted = set(usecols)
+    return lambda col: _clean_column_name(col) in wanted
+
+
+def _check_encoding(file_path, encoding, block_size=1 << 20):
+    """
+    Проверка, что весь файл декодируется в encoding
+
+    Файл читается блоками, поэтому память не зависит от его размера.
+    Выбрасывает UnicodeDecodeError на первом некорректном байте.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    with open(file_path, 'rb') as f:
+        while block := f.read(block_size):
+            decoder.decode(block)
+    decoder.decode(b'', final=True)
+
+
+def load_csv_with_strategies(file_path, encoding, delimiter, stdout=None, usecols=None):
+    """
+    Загрузка CSV с несколькими стратегиями
+
+    usecols - названия колонок, которые нужно прочитать (None - все).
+    Остальные колонки не разбираются и не занимают память.
+    """
+    for strategy in _get_strategies(encoding, delimiter):
         try:
-            df = pd.read_csv(file_path, **strategy, dtype=str, keep_default_na=False)
+            df = pd.read_csv(
+                file_path, **strategy, dtype=str, keep_default_na=False, usecols=_usecols_filter(usecols)
+            )
             if stdout:
                 stdout.write(f"  ✅ Успешно загружено с параметрами: {strategy}")
 
-            df.columns = [col.strip().strip('\ufeff').strip('"') for col in df.columns]
-            return df
+            return _clean_columns(df)
         except Exception:
             continue
 
     raise Exception("Не удалось загрузить CSV ни одной стратегией")
+
+
+def iter_csv_chunks(file_path, encoding, delimiter, chunksize, stdout=None, usecols=None):
+    """
+    Потоковое чтение CSV пачками по chunksize строк
+
+    Стратегия выбирается по первой пачке, после чего файл читается
+    выбранной стратегией до конца. В памяти одновременно держится
+    только одна пачка. usecols - как в load_csv_with_strategies().
+
+    Кодировка заранее проверяется по всему файлу: иначе строка в другой
+    кодировке в середине файла обнаружилась бы только после того, как
+    предыдущие пачки уже записаны в БД. Ошибка разбора в последующих
+    пачках выбрасывается с указанием диапазона строк.
+    """
+    checked_encodings = {}
+    for strategy in _get_strategies(encoding, delimiter):
+        strategy_encoding = strategy['encoding']
+        if strategy_encoding not in checked_encodings:
+            try:
+                _check_encoding(file_path, strategy_encoding)
+                checked_encodings[strategy_encoding] = True
+            except UnicodeDecodeError:
+                checked_encodings[strategy_encoding] = False
+            except (OSError, LookupError):
+                continue
+        if not checked_encodings[strategy_encoding]:
+            continue
+
+        reader = None
+        try:
+            reader = pd.read_csv(
+                file_path, **strategy, dtype=str, keep_default_na=False, chunksize=chunksize,
+                usecols=_usecols_filter(usecols)
+            )
+            first_chunk = next(reader, None)
+        except Exception:
+            if reader is not None:
+                reader.close()
+            continue
+
+        if stdout:
+            stdout.write(f"  ✅ Успешно открыто с параметрами: {strategy}")
+
+        # Файл закрывается и тогда, когда вызывающий код прекращает
+        # чтение после первой пачки (например, по --max-rows)
+        with reader:
+            if first_chunk is None:
+                return
+
+            rows_read = len(first_chunk)
+            yield _clean_columns(first_chunk)
+            while True:
+                try:
+                    chunk = next(reader, None)
+                except ValueError as e:
+                    # ParserError и UnicodeDecodeError - подклассы ValueError
+                    raise Exception(
+                        f"Ошибка чтения CSV в строках {rows_read + 1}-{rows_read + chunksize} "
+                        f"(параметры {strategy}): {e}"
+                    ) from e
+                if chunk is None:
+                    return
+                rows_read += len(chunk)
+                yield _clean_columns(chunk)
+
+    raise Exception("Не удалось загрузить CSV ни одной стратегией")
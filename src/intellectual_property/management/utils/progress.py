@@ -4,6 +4,7 @@
 """
 
 import sys
+from itertools import islice
 from tqdm import tqdm
 from contextlib import contextmanager
 from typing import Optional, Iterable, Iterator, Any
@@ -85,12 +86,7 @@ class ProgressManager:
 
 
 def batch_iterator(iterable, batch_size: int):
-    """Разбивает итерируемый объект на батчи"""
-    batch = []
-    for item in iterable:
-        batch.append(item)
-        if len(batch) >= batch_size:
-            yield batch
-            batch = []
-    if batch:
+    """Разбивает итерируемый объект на батчи (списки по batch_size элементов)"""
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, batch_size)):
         yield batch
\ No newline at end of file
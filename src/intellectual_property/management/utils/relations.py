@@ -0,0 +1,66 @@
+"""
+Буфер связей РИД с авторами и правообладателями
+"""
+
+import sys
+from typing import Optional
+
+import pandas as pd
+
+
+class RelationsBuffer:
+    """
+    Колоночный буфер связей
+
+    Вместо списка словарей (по словарю на каждую связь) значения
+    накапливаются в отдельных списках по колонкам, из которых
+    DataFrame строится без разбора каждой записи.
+
+    Повторы (reg_number, entity_name, relation_type) отбрасываются
+    сразу при добавлении, поэтому в буфере хранятся только уникальные связи.
+
+    Имена сущностей интернируются: один и тот же автор или
+    правообладатель, встречающийся в тысячах записей, хранится одной
+    строкой, а сравнение ключей в словарях идет по указателю.
+    """
+
+    __slots__ = ('reg_number', 'entity_name', 'entity_type', 'relation_type', '_seen', '_reg_numbers')
+
+    def __init__(self):
+        self.reg_number = []
+        self.entity_name = []
+        self.entity_type = []
+        self.relation_type = []
+        self._seen = set()
+        self._reg_numbers = set()
+
+    def append(self, reg_number: str, entity_name: str, entity_type: Optional[str], relation_type: str):
+        """Добавление одной связи (повторная связь игнорируется)"""
+        entity_name = sys.intern(entity_name)
+        key = (reg_number, entity_name, relation_type)
+        if key in self._seen:
+            return
+        self._seen.add(key)
+        self._reg_numbers.add(reg_number)
+
+        self.reg_number.append(reg_number)
+        self.entity_name.append(entity_name)
+        self.entity_type.append(entity_type)
+        self.relation_type.append(relation_type)
+
+    def __len__(self):
+        return len(self.reg_number)
+
+    @property
+    def reg_number_count(self) -> int:
+        """Количество уникальных регистрационных номеров в буфере"""
+        return len(self._reg_numbers)
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """DataFrame с колонками reg_number, entity_name, entity_type, relation_type"""
+        return pd.DataFrame({
+            'reg_number': self.reg_number,
+            'entity_name': self.entity_name,
+            'entity_type': self.entity_type,
+            'relation_type': self.relation_type,
+        })